@@ -0,0 +1,253 @@
+"""Headless per-rerun benchmark for data_visual.py.
+
+Generates synthetic CSVs, drives the dashboard through Streamlit's AppTest
+(every section and every visualization type) and records wall time, peak
+RSS and the size of the element protos sent to the frontend for each rerun.
+
+    python bench_dashboard.py --rows 10000 100000 1000000 --out bench.json
+    python bench_dashboard.py --rows 10000 100000 --baseline bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+APP_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data_visual.py")
+DATA_DIR = "bench_data"
+SECTIONS = ["📊 Overview", "📈 Visualizations", "🔍 Detailed Analysis"]
+VIZ_TYPES = ["Histogram", "Scatter Plot", "Bar Chart", "Box Plot", "Correlation Heatmap", "Pair Plot"]
+GENERATE_CHUNK_ROWS = 1_000_000
+
+
+# --- Synthetic data ---
+def generate_csv(path, rows, num_cols=6, cat_cols=3, cardinality=50, null_rate=0.02, seed=0):
+    """Write a synthetic CSV with numeric, categorical and date columns, in chunks"""
+    rng = np.random.default_rng(seed)
+    categories = np.array([f"cat_{i}" for i in range(cardinality)], dtype=object)
+    for start in range(0, rows, GENERATE_CHUNK_ROWS):
+        n = min(GENERATE_CHUNK_ROWS, rows - start)
+        data = {}
+        for i in range(num_cols):
+            values = rng.normal(100 * (i + 1), 15 * (i + 1), n)
+            values[rng.random(n) < null_rate] = np.nan
+            data[f"num_{i}"] = values
+        for j in range(cat_cols):
+            # Skewed frequencies, like real categorical data
+            values = categories[np.minimum(rng.zipf(1.3, n) - 1, cardinality - 1)]
+            values[rng.random(n) < null_rate] = None
+            data[f"cat_{j}"] = values
+        data["event_date"] = np.datetime_as_string(
+            np.datetime64("2024-01-01") + rng.integers(0, 365, n).astype("timedelta64[D]"))
+        pd.DataFrame(data).to_csv(path, mode="a" if start else "w", header=start == 0, index=False)
+    return path
+
+
+def dataset_path(rows, args):
+    name = f"bench_{rows}r_{args.num_cols}n_{args.cat_cols}c_{args.cardinality}k_{args.null_rate}null.csv"
+    path = os.path.join(DATA_DIR, name)
+    if not os.path.exists(path):
+        os.makedirs(DATA_DIR, exist_ok=True)
+        print(f"Generating {path}...", file=sys.stderr)
+        generate_csv(path, rows, args.num_cols, args.cat_cols, args.cardinality, args.null_rate)
+    return path
+
+
+# --- Measurements ---
+def reset_peak_rss():
+    """Reset the kernel's peak-RSS counter (Linux only); returns False if unsupported"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # Lifetime peak; kilobytes on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+
+
+def frontend_bytes(node):
+    """Serialized size of every element proto in an AppTest tree"""
+    total = 0
+    proto = getattr(node, "proto", None)
+    if proto is not None and hasattr(proto, "ByteSize"):
+        total += proto.ByteSize()
+    for child in getattr(node, "children", {}).values():
+        total += frontend_bytes(child)
+    return total
+
+
+MEDIA_BYTES = {"total": 0}
+
+
+def count_media_bytes():
+    """Count the bytes of chart images and other media the script hands to the frontend.
+
+    AppTest gives each run its own mock runtime with an in-memory media store
+    and drops it when the run ends, so the store class is wrapped instead of
+    read afterwards. Returns False if this Streamlit version has no such store.
+    """
+    try:
+        from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    except ImportError:
+        return False
+    load_and_get_id = MemoryMediaFileStorage.load_and_get_id
+
+    def counting_load_and_get_id(self, path_or_data, *args, **kwargs):
+        if isinstance(path_or_data, (bytes, bytearray)):
+            MEDIA_BYTES["total"] += len(path_or_data)
+        elif isinstance(path_or_data, str) and os.path.exists(path_or_data):
+            MEDIA_BYTES["total"] += os.path.getsize(path_or_data)
+        return load_and_get_id(self, path_or_data, *args, **kwargs)
+
+    MemoryMediaFileStorage.load_and_get_id = counting_load_and_get_id
+    return True
+
+
+def timed_run(at, step, rows, results):
+    reset_peak_rss()
+    media_before = MEDIA_BYTES["total"]
+    start = time.perf_counter()
+    at.run()
+    wall = time.perf_counter() - start
+    media = MEDIA_BYTES["total"] - media_before if MEDIA_BYTES.get("counting") else None
+    result = {
+        "rows": rows,
+        "step": step,
+        "wall_s": round(wall, 4),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        # Element protos plus the media they reference; media is None when it can't be counted
+        "frontend_bytes": frontend_bytes(at._tree) + (media or 0),
+        "media_bytes": media,
+        "exceptions": [str(e.value) for e in at.exception],
+    }
+    results.append(result)
+    print(f"{rows:>10,} {step:<40} {wall:8.3f}s {result['peak_rss_mb']:9.1f} MB "
+          f"{result['frontend_bytes'] / 1024:10.1f} KB", file=sys.stderr)
+    return result
+
+
+def checkbox(at, label):
+    return next(box for box in at.checkbox if box.label == label)
+
+
+def run_dataset(rows, args, results):
+    from streamlit.testing.v1 import AppTest
+
+    os.environ["DASHBOARD_DATASET"] = dataset_path(rows, args)
+    at = AppTest.from_file(APP_FILE, default_timeout=args.timeout)
+    timed_run(at, "load", rows, results)
+    if args.compact:
+        checkbox(at, "Compact memory mode").check()
+        timed_run(at, "load (compact)", rows, results)
+    if args.approx:
+        checkbox(at, "Approximate statistics").check()
+        timed_run(at, "load (approximate)", rows, results)
+
+    for section in SECTIONS:
+        at.radio(key="active_section").set_value(section)
+        timed_run(at, f"section {section}", rows, results)
+        if section == SECTIONS[1]:
+            for viz_type in VIZ_TYPES:
+                at.selectbox(key="viz_type").set_value(viz_type)
+                timed_run(at, f"viz {viz_type}", rows, results)
+                # A second identical rerun shows what the caches save
+                timed_run(at, f"viz {viz_type} (rerun)", rows, results)
+
+
+# --- Baseline comparison ---
+def compare(results, baseline, tolerance, min_seconds):
+    """Steps whose wall time or frontend bytes grew beyond tolerance against the baseline"""
+    previous = {(r["rows"], r["step"]): r for r in baseline["results"]}
+    regressions = []
+    for result in results:
+        base = previous.get((result["rows"], result["step"]))
+        if base is None:
+            continue
+        slower = result["wall_s"] > base["wall_s"] * (1 + tolerance) and \
+            result["wall_s"] - base["wall_s"] > min_seconds
+        bigger = result["frontend_bytes"] > base["frontend_bytes"] * (1 + tolerance)
+        if slower or bigger:
+            regressions.append({"rows": result["rows"], "step": result["step"],
+                                "wall_s": [base["wall_s"], result["wall_s"]],
+                                "frontend_bytes": [base["frontend_bytes"], result["frontend_bytes"]]})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000, 10_000_000])
+    parser.add_argument("--num-cols", type=int, default=6)
+    parser.add_argument("--cat-cols", type=int, default=3)
+    parser.add_argument("--cardinality", type=int, default=50)
+    parser.add_argument("--null-rate", type=float, default=0.02)
+    parser.add_argument("--compact", action="store_true", help="also enable Compact memory mode")
+    parser.add_argument("--approx", action="store_true", help="also enable Approximate statistics")
+    parser.add_argument("--timeout", type=float, default=900, help="seconds allowed per rerun")
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--baseline", help="earlier results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown")
+    parser.add_argument("--min-seconds", type=float, default=0.05, help="ignore slowdowns smaller than this")
+    args = parser.parse_args()
+
+    # A fresh dataset cache, so the first load of each file really parses it
+    os.environ["CSV_CACHE_DIR"] = tempfile.mkdtemp(prefix="bench_csv_cache_")
+
+    import streamlit as st
+
+    MEDIA_BYTES["counting"] = count_media_bytes()
+    if not MEDIA_BYTES["counting"]:
+        print("Can't count media bytes with this Streamlit version; frontend_bytes excludes images",
+              file=sys.stderr)
+
+    results = []
+    for rows in args.rows:
+        run_dataset(rows, args, results)
+        st.cache_data.clear()
+        st.cache_resource.clear()
+
+    report = {
+        "meta": {
+            "rows": args.rows, "num_cols": args.num_cols, "cat_cols": args.cat_cols,
+            "cardinality": args.cardinality, "null_rate": args.null_rate,
+            "compact": args.compact, "approx": args.approx, "media_counted": MEDIA_BYTES["counting"],
+            "python": platform.python_version(), "streamlit": st.__version__,
+            "machine": platform.machine(), "cpus": os.cpu_count(),
+        },
+        "results": results,
+    }
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(results)} measurements to {args.out}", file=sys.stderr)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance, args.min_seconds)
+        for regression in regressions:
+            print(f"REGRESSION {regression['rows']:,} {regression['step']}: "
+                  f"{regression['wall_s'][0]}s -> {regression['wall_s'][1]}s, "
+                  f"{regression['frontend_bytes'][0]} -> {regression['frontend_bytes'][1]} bytes")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against baseline", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
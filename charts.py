@@ -0,0 +1,287 @@
+import threading
+from collections import OrderedDict
+from io import BytesIO
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import seaborn as sns
+
+# --- Large-data rendering settings ---
+LARGE_DATA_ROWS = 200_000  # above this, scatter and pair plots switch to aggregated rendering
+SAMPLE_ROWS = 50_000
+MIN_ROWS_PER_GROUP = 200  # rows kept for each hue category, however rare
+HEXBIN_GRIDSIZE = 80
+PAIR_BINS = 60
+
+# --- Histogram settings ---
+KDE_GRID_POINTS = 1024
+KDE_CUTOFF = 4  # kernel truncated at this many bandwidths
+MAX_AUTO_BINS = 500
+
+# --- Figure cache settings ---
+FIGURE_CACHE_MB = 64
+FIGURE_DPI = 100
+
+
+def is_large(df):
+    return len(df) > LARGE_DATA_ROWS
+
+
+def stratified_sample(df, n=SAMPLE_ROWS, hue=None, random_state=0):
+    """Random sample of about n rows that keeps every category of hue.
+
+    Each category gets a share proportional to its size, but never fewer than
+    MIN_ROWS_PER_GROUP rows (or all of them, if it is smaller), so rare
+    categories still show up in the legend.
+    """
+    if len(df) <= n:
+        return df
+    rng = np.random.default_rng(random_state)
+    if hue is None:
+        return df.iloc[np.sort(rng.choice(len(df), size=n, replace=False))]
+
+    codes, _ = pd.factorize(df[hue], use_na_sentinel=True)
+    codes = codes + 1  # missing values become their own group 0
+    sizes = np.bincount(codes)
+    quotas = np.maximum(np.ceil(sizes * n / len(df)), np.minimum(sizes, MIN_ROWS_PER_GROUP))
+
+    # Shuffle, then keep the first quota rows of each group
+    perm = rng.permutation(len(df))
+    order = perm[np.argsort(codes[perm], kind="stable")]
+    group_starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    sorted_codes = codes[order]
+    rank = np.arange(len(df)) - group_starts[sorted_codes]
+    keep = order[rank < quotas[sorted_codes]]
+    return df.iloc[np.sort(keep)]
+
+
+def finite_pair(x, y):
+    """Float arrays of two columns, restricted to rows where both are finite"""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    mask = np.isfinite(x) & np.isfinite(y)
+    return x[mask], y[mask]
+
+
+def plot_hexbin(ax, df, x_col, y_col, gridsize=HEXBIN_GRIDSIZE):
+    """Draw a log-scaled hexbin density of two columns and return the mappable"""
+    x, y = finite_pair(df[x_col], df[y_col])
+    return ax.hexbin(x, y, gridsize=gridsize, bins="log", mincnt=1, cmap="viridis")
+
+
+def column_edges(values, bins):
+    finite = values[np.isfinite(values)]
+    lo, hi = (finite.min(), finite.max()) if finite.size else (0.0, 1.0)
+    if lo == hi:
+        lo, hi = lo - 0.5, hi + 0.5
+    return np.linspace(lo, hi, bins + 1)
+
+
+def binned_pair_histograms(df, cols, hue=None, bins=PAIR_BINS):
+    """Precompute the histograms behind a binned pair plot.
+
+    Returns a dict with per-column bin ``edges``, 1D ``diagonal`` counts (one
+    array per hue category, or a single ``None`` key without hue) and 2D
+    ``panels`` counts for every ordered pair of distinct columns.
+    """
+    values = {col: np.asarray(df[col], dtype=np.float64) for col in cols}
+    edges = {col: column_edges(values[col], bins) for col in cols}
+
+    if hue is not None:
+        groups = {name: np.asarray(idx) for name, idx in df.groupby(hue, observed=True).indices.items()}
+    else:
+        groups = {None: None}
+
+    diagonal = {}
+    for col in cols:
+        diagonal[col] = {}
+        for name, idx in groups.items():
+            col_values = values[col] if idx is None else values[col][idx]
+            diagonal[col][name] = np.histogram(col_values[np.isfinite(col_values)], bins=edges[col])[0]
+
+    panels = {}
+    for i, x_col in enumerate(cols):
+        for y_col in cols[i + 1:]:
+            x, y = finite_pair(values[x_col], values[y_col])
+            counts = np.histogram2d(x, y, bins=[edges[x_col], edges[y_col]])[0]
+            panels[(x_col, y_col)] = counts
+            panels[(y_col, x_col)] = counts.T
+
+    return {"edges": edges, "diagonal": diagonal, "panels": panels}
+
+
+def plot_binned_pairs(fig, hists, cols):
+    """Draw a pair-plot grid from binned_pair_histograms output"""
+    n = len(cols)
+    axes = fig.subplots(n, n, squeeze=False)
+    for row, y_col in enumerate(cols):
+        for col_idx, x_col in enumerate(cols):
+            ax = axes[row][col_idx]
+            if x_col == y_col:
+                for name, counts in hists["diagonal"][x_col].items():
+                    ax.stairs(counts, hists["edges"][x_col], label=None if name is None else str(name))
+            else:
+                counts = hists["panels"][(x_col, y_col)]
+                # Log colour scale; empty bins stay blank
+                shown = np.where(counts > 0, np.log10(np.maximum(counts, 1)) + 1, np.nan)
+                ax.pcolormesh(hists["edges"][x_col], hists["edges"][y_col], shown.T, cmap="viridis")
+            if row == n - 1:
+                ax.set_xlabel(x_col)
+            if col_idx == 0:
+                ax.set_ylabel(y_col)
+    if any(name is not None for name in hists["diagonal"][cols[0]]):
+        axes[0][0].legend(fontsize="small")
+    return axes
+
+
+class ColumnDistribution:
+    """Sorted values and a binned KDE for one numeric column.
+
+    Built once per dataset column; histogram counts for any bin count are then
+    answered by binary search over the sorted values, so moving the bin slider
+    never touches the raw column again. The KDE is evaluated on a fixed grid
+    by linear binning and an FFT convolution with a Gaussian kernel, using
+    Scott's bandwidth like seaborn's kde=True.
+    """
+
+    def __init__(self, series):
+        values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+        self.sorted_values = np.sort(values[np.isfinite(values)])
+        self.n = len(self.sorted_values)
+        self.kde_grid, self.kde_density = self._binned_kde()
+
+    @property
+    def bounds(self):
+        if self.n == 0:
+            return 0.0, 1.0
+        lo, hi = self.sorted_values[0], self.sorted_values[-1]
+        return (lo - 0.5, hi + 0.5) if lo == hi else (lo, hi)
+
+    def auto_bins(self):
+        """numpy's 'auto' rule (max of Sturges and Freedman-Diaconis), capped"""
+        if self.n < 2:
+            return 1
+        sturges = np.log2(self.n) + 1
+        lo, hi = self.bounds
+        q1, q3 = np.quantile(self.sorted_values, [0.25, 0.75])
+        fd_width = 2 * (q3 - q1) / self.n ** (1 / 3)
+        fd = (hi - lo) / fd_width if fd_width > 0 else 0
+        return int(min(max(np.ceil(sturges), np.ceil(fd)), MAX_AUTO_BINS))
+
+    def histogram(self, bins):
+        """Counts and edges matching np.histogram(values, bins)"""
+        edges = np.linspace(*self.bounds, bins + 1)
+        inner = np.searchsorted(self.sorted_values, edges[1:-1], side="left")
+        counts = np.diff(np.concatenate([[0], inner, [self.n]]))
+        return counts, edges
+
+    def _binned_kde(self):
+        if self.n < 2:
+            return None, None
+        std = self.sorted_values.std(ddof=1)
+        bandwidth = std * self.n ** (-1 / 5)
+        if not bandwidth > 0:
+            return None, None
+
+        lo = self.sorted_values[0] - 3 * bandwidth
+        hi = self.sorted_values[-1] + 3 * bandwidth
+        grid = np.linspace(lo, hi, KDE_GRID_POINTS)
+        step = grid[1] - grid[0]
+
+        # Linear binning: each value splits its weight between the two nearest grid points
+        position = (self.sorted_values - lo) / step
+        left = np.clip(np.floor(position).astype(np.int64), 0, KDE_GRID_POINTS - 2)
+        frac = position - left
+        weights = np.bincount(left, weights=1 - frac, minlength=KDE_GRID_POINTS) + \
+            np.bincount(left + 1, weights=frac, minlength=KDE_GRID_POINTS)
+
+        half_width = min(int(np.ceil(KDE_CUTOFF * bandwidth / step)), KDE_GRID_POINTS - 1)
+        offsets = np.arange(-half_width, half_width + 1) * step
+        kernel = np.exp(-0.5 * (offsets / bandwidth) ** 2) / (bandwidth * np.sqrt(2 * np.pi))
+
+        size = KDE_GRID_POINTS + len(kernel) - 1
+        fft_size = 1 << (size - 1).bit_length()
+        smoothed = np.fft.irfft(np.fft.rfft(weights, fft_size) * np.fft.rfft(kernel, fft_size), fft_size)
+        density = smoothed[half_width:half_width + KDE_GRID_POINTS] / self.n
+        return grid, np.maximum(density, 0)
+
+    def plot(self, ax, bins=None):
+        """Draw the histogram with its KDE scaled to counts, like sns.histplot(kde=True)"""
+        counts, edges = self.histogram(bins or self.auto_bins())
+        color = sns.color_palette()[0]
+        ax.bar(edges[:-1], counts, width=np.diff(edges), align="edge", color=color, alpha=0.75,
+               edgecolor="white", linewidth=0.5)
+        if self.kde_grid is not None:
+            bin_width = edges[1] - edges[0]
+            ax.plot(self.kde_grid, self.kde_density * self.n * bin_width, color=color)
+        ax.set_xlim(edges[0] - (edges[1] - edges[0]) * 0.5, edges[-1] + (edges[1] - edges[0]) * 0.5)
+        ax.set_ylabel("Count")
+
+
+class FigureCache:
+    """LRU cache of rendered chart images, bounded by total encoded bytes.
+
+    Charts are keyed on (dataset hash, viz type, parameters). On a miss the
+    draw callback builds a matplotlib figure (or seaborn grid), which is
+    encoded and then always closed, so no figure outlives a single render.
+    """
+
+    def __init__(self, budget_mb=FIGURE_CACHE_MB):
+        self.budget = budget_mb * 1024 * 1024
+        self._images = OrderedDict()  # key -> encoded bytes
+        self._nbytes = 0
+        self._lock = threading.Lock()
+        # pyplot keeps global state, so renders from concurrent sessions are serialized
+        self._render_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _get(self, key):
+        with self._lock:
+            data = self._images.get(key)
+            if data is not None:
+                self._images.move_to_end(key)
+                self.hits += 1
+            return data
+
+    def _put(self, key, data):
+        with self._lock:
+            if key in self._images:
+                self._nbytes -= len(self._images.pop(key))
+            self._images[key] = data
+            self._nbytes += len(data)
+            while len(self._images) > 1 and self._nbytes > self.budget:
+                _, evicted = self._images.popitem(last=False)
+                self._nbytes -= len(evicted)
+
+    def render(self, key, draw, fmt="png"):
+        """Return encoded image bytes for key, calling draw() only on a miss"""
+        key = (fmt,) + tuple(key)
+        data = self._get(key)
+        if data is not None:
+            return data
+
+        with self._render_lock:
+            data = self._get(key)
+            if data is not None:
+                return data
+            with self._lock:
+                self.misses += 1
+            fig = None
+            try:
+                fig = draw()
+                fig = getattr(fig, "figure", fig)  # seaborn grids wrap a Figure
+                buffer = BytesIO()
+                fig.savefig(buffer, format=fmt, dpi=FIGURE_DPI, bbox_inches="tight")
+                data = buffer.getvalue()
+            finally:
+                # Close whatever draw() created, even if it failed halfway
+                plt.close(fig if fig is not None else "all")
+        self._put(key, data)
+        return data
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses,
+                    "entries": len(self._images), "bytes": self._nbytes}
@@ -2,27 +2,64 @@ import streamlit as st
 import pandas as pd
 import io
 
+from csv_store import read_csv_compact
+from paged_table import TableView, apply_editor_changes, page_controls
+
 st.set_page_config(page_title="CSV Editor", layout="wide")
 
 st.title("📄 CSV File Editor")
 
+
+def save_page_edits(editor_key, page_index):
+    """Fold the page's edits into the full frame, then start a fresh editor on the result"""
+    changes = st.session_state[editor_key]
+    st.session_state.editor_df = apply_editor_changes(st.session_state.editor_df, page_index, changes)
+    st.session_state.editor_view = TableView(st.session_state.editor_df)
+    st.session_state.editor_version += 1
+
+
 # Upload CSV
 uploaded_file = st.file_uploader("Upload a CSV file", type=["csv"])
+compact_mode = st.checkbox("Compact memory mode", value=False,
+                           help="Parse in chunks and downcast numbers to the smallest safe width")
 if uploaded_file is not None:
-    df = pd.read_csv(uploaded_file)
+    # The full frame lives on the server; edits made one page at a time are merged into it
+    source_key = (uploaded_file.file_id, compact_mode)
+    if st.session_state.get("editor_source") != source_key:
+        if compact_mode:
+            # Text columns stay as plain strings so any value can still be typed in
+            df = read_csv_compact(uploaded_file, category_ratio=None)
+        else:
+            df = pd.read_csv(uploaded_file)
+        st.session_state.editor_source = source_key
+        st.session_state.editor_df = df.reset_index(drop=True)
+        st.session_state.editor_view = TableView(st.session_state.editor_df)
+        st.session_state.editor_version = 0
+
+    df = st.session_state.editor_df
+    if compact_mode and "memory_report" in df.attrs:
+        report = df.attrs["memory_report"]
+        st.caption(f"Memory: {report['compact_bytes'] / 1024 ** 2:.1f} MB instead of "
+                   f"{report['original_bytes'] / 1024 ** 2:.1f} MB")
 
     st.subheader("Edit the data below")
-    edited_df = st.data_editor(df, num_rows="dynamic", use_container_width=True)
+    page_positions = page_controls(st.session_state.editor_view, "editor_table")
+    page_index = df.index[page_positions]
+    editor_key = f"editor_page_{st.session_state.editor_version}"
+    st.data_editor(df.iloc[page_positions], num_rows="dynamic", use_container_width=True, key=editor_key,
+                   on_change=save_page_edits, args=(editor_key, page_index))
 
-    # Save modified CSV to buffer
-    csv_buffer = io.StringIO()
-    edited_df.to_csv(csv_buffer, index=False)
-    csv_data = csv_buffer.getvalue()
+    # Save modified CSV to buffer, once per version of the data
+    if st.session_state.get("editor_csv_version") != (source_key, st.session_state.editor_version):
+        csv_buffer = io.StringIO()
+        df.to_csv(csv_buffer, index=False)
+        st.session_state.editor_csv = csv_buffer.getvalue()
+        st.session_state.editor_csv_version = (source_key, st.session_state.editor_version)
 
     # Download button
     st.download_button(
         label="📥 Download Modified CSV",
-        data=csv_data,
+        data=st.session_state.editor_csv,
         file_name="modified.csv",
         mime="text/csv"
     )
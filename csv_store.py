@@ -0,0 +1,274 @@
+import hashlib
+import os
+import threading
+import warnings
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+# --- Cache settings ---
+CACHE_DIR = os.environ.get("CSV_CACHE_DIR", ".csv_cache")
+MEMORY_BUDGET_MB = int(os.environ.get("CSV_CACHE_MEMORY_MB", "2048"))
+
+# --- Compact loading settings ---
+SAMPLE_ROWS = 50_000
+CHUNK_ROWS = 500_000
+CATEGORY_RATIO = 0.5  # max unique/rows ratio for a string column to become category
+
+# --- Schema detection settings ---
+DATETIME_SAMPLE_ROWS = 200
+
+
+def hash_bytes(data):
+    """Return a short content hash for raw upload bytes"""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def frame_nbytes(df):
+    """In-memory size of a DataFrame, including string payloads"""
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def downcast_numeric(s):
+    """Downcast a numeric Series to the smallest dtype that holds every value exactly"""
+    if pd.api.types.is_bool_dtype(s) or not pd.api.types.is_numeric_dtype(s):
+        return s
+    if pd.api.types.is_integer_dtype(s):
+        kind = "unsigned" if len(s) and s.min() >= 0 else "integer"
+        return pd.to_numeric(s, downcast=kind)
+    # Only narrow floats when float32 round-trips every value
+    values = s.to_numpy()
+    narrowed = values.astype(np.float32)
+    if np.array_equal(narrowed.astype(values.dtype), values, equal_nan=True):
+        return pd.Series(narrowed, index=s.index, name=s.name)
+    return s
+
+
+def infer_category_columns(sample, category_ratio=CATEGORY_RATIO):
+    """Pick the string columns of a sample whose cardinality is low enough for category"""
+    if category_ratio is None or sample.empty:
+        return []
+    text_cols = sample.select_dtypes(include=["object"]).columns
+    return [col for col in text_cols
+            if sample[col].nunique(dropna=True) <= category_ratio * len(sample)]
+
+
+def concat_frames(frames, downcast=True, release=True):
+    """Concatenate frames column by column, merging categories instead of falling back to object.
+
+    With release, each column is deleted from the source frames once combined,
+    so peak memory stays near one extra column rather than a second copy.
+    """
+    combined = {}
+    for col in frames[0].columns:
+        parts = [frame[col] for frame in frames]
+        if all(isinstance(p.dtype, pd.CategoricalDtype) for p in parts):
+            try:
+                combined[col] = pd.Series(union_categoricals(parts), name=col)
+            except TypeError:
+                # e.g. an all-empty chunk whose categories have a different dtype
+                combined[col] = pd.concat([p.astype(object) for p in parts], ignore_index=True)
+        else:
+            combined[col] = pd.concat(parts, ignore_index=True)
+            if downcast:
+                combined[col] = downcast_numeric(combined[col])
+        if release:
+            for frame in frames:
+                del frame[col]
+    return pd.DataFrame(combined)
+
+
+def read_csv_compact(source, sample_rows=SAMPLE_ROWS, chunk_rows=CHUNK_ROWS,
+                     category_ratio=CATEGORY_RATIO):
+    """Read a CSV in chunks with category strings and downcast numerics.
+
+    Column plans are inferred from the first sample_rows rows. Each chunk is
+    compacted before the next one is parsed, so peak memory stays close to the
+    compact size rather than the default-dtype size. The returned frame carries
+    ``attrs["memory_report"]`` with the default and compact byte counts.
+    """
+    sample = pd.read_csv(source, nrows=sample_rows)
+    category_cols = infer_category_columns(sample, category_ratio)
+    # Bytes per value of the default object dtype, to report savings without a full default parse
+    object_bytes = {col: sample[col].memory_usage(index=False, deep=True) / max(len(sample), 1)
+                    for col in category_cols}
+    if hasattr(source, "seek"):
+        source.seek(0)
+
+    chunks = []
+    original_bytes = 0
+    reader = pd.read_csv(source, chunksize=chunk_rows,
+                         dtype={col: "category" for col in category_cols})
+    for chunk in reader:
+        for col in chunk.columns:
+            if col in category_cols:
+                original_bytes += int(object_bytes[col] * len(chunk))
+            else:
+                original_bytes += int(chunk[col].memory_usage(index=False, deep=True))
+                chunk[col] = downcast_numeric(chunk[col])
+        chunks.append(chunk)
+
+    if not chunks:
+        df = sample.iloc[0:0]
+        df.attrs["memory_report"] = {"original_bytes": 0, "compact_bytes": 0}
+        return df
+
+    # Categories differ between chunks, so combine them explicitly
+    df = concat_frames(chunks)
+
+    # The sample can under-estimate cardinality; undo categories that didn't pay off
+    for col in category_cols:
+        if isinstance(df[col].dtype, pd.CategoricalDtype) and \
+                df[col].cat.categories.size > category_ratio * max(len(df), 1):
+            df[col] = df[col].astype(object)
+
+    df.attrs["memory_report"] = {"original_bytes": original_bytes,
+                                 "compact_bytes": frame_nbytes(df)}
+    return df
+
+
+def _parse_dates(values):
+    with warnings.catch_warnings():
+        # Format inference warnings are expected for non-date text
+        warnings.simplefilter("ignore")
+        return pd.to_datetime(values, errors="coerce")
+
+
+def convert_datetime_columns(df, sample_rows=DATETIME_SAMPLE_ROWS):
+    """Convert text columns whose values are all dates to datetime64, in place.
+
+    Every text column is screened on a bounded sample; only columns whose
+    sample parses completely are parsed in full, and they are kept only if
+    every non-null value parses. Category columns are checked through their
+    categories, so each distinct value is parsed once. The converted column
+    names are recorded in ``df.attrs["datetime_columns"]``.
+    """
+    converted = []
+    for col in df.select_dtypes(include=["object", "category"]).columns:
+        s = df[col]
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            categories = s.cat.categories
+            if categories.empty or categories.dtype != object:
+                continue
+            parsed = pd.DatetimeIndex(_parse_dates(categories))
+            if parsed.isna().any():
+                continue
+            df[col] = pd.Series(parsed.take(s.cat.codes.to_numpy(), allow_fill=True, fill_value=pd.NaT),
+                                index=s.index, name=col)
+            converted.append(col)
+            continue
+
+        sample = s.sample(min(sample_rows, len(s)), random_state=0).dropna()
+        if sample.empty or _parse_dates(sample).isna().any():
+            continue
+        parsed = _parse_dates(s)
+        if (parsed.isna() == s.isna()).all():
+            df[col] = parsed
+            converted.append(col)
+
+    df.attrs["datetime_columns"] = converted
+    return df
+
+
+class DatasetStore:
+    """Parse-once store for uploaded datasets, keyed on content hash.
+
+    Parsed frames are kept in an in-memory LRU bounded by a byte budget and
+    spilled to Parquet on local disk, so an evicted entry (or one parsed by a
+    previous server process) is reloaded from columnar storage instead of
+    being re-parsed from CSV.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, memory_budget_mb=MEMORY_BUDGET_MB):
+        self.cache_dir = cache_dir
+        self.memory_budget = memory_budget_mb * 1024 * 1024
+        self._frames = OrderedDict()  # key -> (df, nbytes)
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "parses": 0, "evictions": 0}
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.parquet")
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.RLock())
+
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._frames.get(key)
+            if entry is not None:
+                self._frames.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return entry[0]
+        return None
+
+    def _remember(self, key, df):
+        nbytes = frame_nbytes(df)
+        with self._lock:
+            self._frames[key] = (df, nbytes)
+            self._frames.move_to_end(key)
+            # Evict least recently used frames, but always keep the newest one
+            while len(self._frames) > 1 and self.used_bytes() > self.memory_budget:
+                self._frames.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def _spill(self, key, df):
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            df.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, path)
+        except Exception:
+            # Mixed-type object columns can't always be written as Parquet;
+            # the frame is still served from memory in that case.
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def used_bytes(self):
+        return sum(nbytes for _, nbytes in self._frames.values())
+
+    def get(self, key):
+        """Return the cached frame for key, or None if it was never loaded"""
+        df = self._lookup(key)
+        if df is not None:
+            return df
+        if os.path.exists(self._path(key)):
+            with self._key_lock(key):
+                df = self._lookup(key)
+                if df is None:
+                    df = pd.read_parquet(self._path(key))
+                    self.stats["disk_hits"] += 1
+                    self._remember(key, df)
+            return df
+        return None
+
+    def get_or_load(self, key, loader, spill=True):
+        """Return the frame for key, calling loader() only if it isn't cached anywhere.
+
+        spill=False keeps a short-lived frame in memory only; once evicted it
+        is loaded again.
+        """
+        df = self.get(key)
+        if df is not None:
+            return df
+
+        # Concurrent sessions uploading the same file wait for a single parse
+        with self._key_lock(key):
+            df = self.get(key)
+            if df is None:
+                df = loader()
+                self.stats["parses"] += 1
+                if spill:
+                    self._spill(key, df)
+                self._remember(key, df)
+        return df
+
+    def invalidate(self, key):
+        with self._lock:
+            self._frames.pop(key, None)
+        if os.path.exists(self._path(key)):
+            os.remove(self._path(key))
@@ -0,0 +1,191 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# --- Profile settings ---
+MAX_VALUE_COUNTS = 1000  # value counts kept per categorical column
+QUANTILES = [0.25, 0.5, 0.75]
+CORR_CHUNK_ROWS = 250_000  # rows per block when accumulating correlation moments
+CORR_WORKERS = min(4, os.cpu_count() or 1)
+DESCRIBE_ROWS = ["count", "unique", "top", "freq", "mean", "std", "min", "25%", "50%", "75%", "max"]
+
+
+def is_numeric(series):
+    """True for int/float columns of any width (bool columns count as categorical)"""
+    return pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+
+
+class DatasetProfile:
+    """Per-column statistics for a dataset, computed once and read by every tab.
+
+    ``summary`` has one row per column with dtype, missing counts, cardinality
+    and describe()-style statistics. ``value_counts`` holds the most frequent
+    values of every non-numeric column (up to MAX_VALUE_COUNTS) and
+    ``least_common`` its rarest value. Profiles built from sketches carry
+    ``error_bounds`` describing how far their estimates can be off.
+    """
+
+    def __init__(self, rows, summary, value_counts, least_common, error_bounds=None):
+        self.rows = rows
+        self.summary = summary
+        self.value_counts = value_counts
+        self.least_common = least_common
+        self.error_bounds = error_bounds or {}
+
+    @property
+    def approximate(self):
+        return bool(self.error_bounds)
+
+    @property
+    def columns(self):
+        return self.summary.index.tolist()
+
+    @property
+    def numeric_columns(self):
+        return self.summary.index[self.summary["numeric"]].tolist()
+
+    def missing(self):
+        return self.summary[["missing", "missing_pct"]]
+
+    def unique(self, col):
+        return int(self.summary.at[col, "unique"])
+
+    def stat(self, col, name):
+        return self.summary.at[col, name]
+
+    def describe(self, cols):
+        """Equivalent of df[cols].describe(include='all').T"""
+        table = self.summary.loc[cols, DESCRIBE_ROWS]
+        # Drop statistics that don't apply to any of the selected columns, like describe() does
+        return table.dropna(axis=1, how="all")
+
+
+def build_profile(df, max_value_counts=MAX_VALUE_COUNTS):
+    """Compute a DatasetProfile with vectorized, column-wise aggregations"""
+    rows = len(df)
+    numeric_cols = [col for col in df.columns if is_numeric(df[col])]
+    numeric_set = set(numeric_cols)
+    other_cols = [col for col in df.columns if col not in numeric_set]
+
+    summary = pd.DataFrame(index=df.columns)
+    summary["dtype"] = df.dtypes.astype(str)
+    summary["numeric"] = [col in numeric_set for col in df.columns]
+    summary["missing"] = df.isna().sum()
+    summary["missing_pct"] = (summary["missing"] / max(rows, 1) * 100).round(2)
+    summary["count"] = rows - summary["missing"]
+    for name in DESCRIBE_ROWS[1:]:
+        summary[name] = None
+
+    if numeric_cols:
+        num = df[numeric_cols]
+        stats = num.agg(["mean", "std", "min", "max"]).T
+        quantiles = num.quantile(QUANTILES).T
+        quantiles.columns = [f"{int(q * 100)}%" for q in QUANTILES]
+        for name in ["mean", "std", "min", "max"]:
+            summary.loc[numeric_cols, name] = stats[name]
+        for name in quantiles.columns:
+            summary.loc[numeric_cols, name] = quantiles[name]
+        summary.loc[numeric_cols, "unique"] = num.nunique()
+
+    value_counts, least_common = {}, {}
+    for col in other_cols:
+        # One value_counts per column gives cardinality, top, freq and rarest value
+        counts = df[col].value_counts()
+        summary.at[col, "unique"] = len(counts)
+        if not counts.empty:
+            summary.at[col, "top"] = counts.index[0]
+            summary.at[col, "freq"] = counts.iloc[0]
+            least_common[col] = (counts.index[-1], counts.iloc[-1])
+        value_counts[col] = counts.head(max_value_counts)
+
+    return DatasetProfile(rows, summary, value_counts, least_common)
+
+
+def _chunk_moments(df, cols, means, start, stop):
+    """Pairwise-complete counts and sums for one block of rows"""
+    block = df.iloc[start:stop][cols].to_numpy(dtype=np.float64, na_value=np.nan) - means
+    mask = ~np.isnan(block)
+    valid = mask.astype(np.float64)
+    x = np.where(mask, block, 0.0)
+    return valid.T @ valid, x.T @ valid, (x * x).T @ valid, x.T @ x
+
+
+def pairwise_pearson(df, cols, chunk_rows=CORR_CHUNK_ROWS, n_jobs=None):
+    """Pearson correlation over pairwise-complete rows, like DataFrame.corr().
+
+    Counts and sums for every column pair come from a few matrix products per
+    block of rows, so memory stays bounded by the block size. Blocks are
+    processed on a thread pool (NumPy releases the GIL in matmul) and their
+    moments added up. Returns the correlation and pairwise count matrices.
+    """
+    # Centering first keeps the one-pass variance formula numerically stable
+    means = df[cols].mean().to_numpy(dtype=np.float64)
+    means = np.nan_to_num(means)
+    starts = range(0, max(len(df), 1), chunk_rows)
+    with ThreadPoolExecutor(max_workers=n_jobs or CORR_WORKERS) as pool:
+        parts = list(pool.map(lambda start: _chunk_moments(df, cols, means, start, start + chunk_rows), starts))
+    counts, sums, squares, products = (sum(part[i] for part in parts) for i in range(4))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = products - sums * sums.T / counts
+        var_x = squares - sums ** 2 / counts
+        var_y = squares.T - sums.T ** 2 / counts
+        corr = np.clip(cov / np.sqrt(var_x * var_y), -1.0, 1.0)
+    corr[~(np.isfinite(corr) & (counts > 1))] = np.nan
+    np.fill_diagonal(corr, np.where(np.diag(var_x) > 0, 1.0, np.nan))
+
+    return (pd.DataFrame(corr, index=cols, columns=cols),
+            pd.DataFrame(counts.astype(np.int64), index=cols, columns=cols))
+
+
+def correlation_matrix(df, cols, method="pearson", n_jobs=None):
+    """Full correlation and pairwise count matrices for cols.
+
+    Spearman ranks each column over its non-null values and reuses the
+    Pearson path; unlike pandas it doesn't re-rank per column pair, which only
+    differs when the two columns have missing values in different rows.
+    Kendall has no matrix-product form and goes through PairwiseKendall,
+    one pandas call per column pair.
+    """
+    if method == "pearson":
+        return pairwise_pearson(df, cols, n_jobs=n_jobs)
+    if method == "spearman":
+        return pairwise_pearson(df[cols].rank(), cols, n_jobs=n_jobs)
+    if method == "kendall":
+        return PairwiseKendall(df).matrix(cols)
+    raise ValueError(f"Unknown correlation method: {method}")
+
+
+class PairwiseKendall:
+    """Kendall correlations of a dataset, computed only for the column pairs asked for.
+
+    Kendall's tau costs a pandas call per column pair, so the full matrix of a
+    wide dataset is never built; computed pairs are kept for later selections.
+    """
+
+    def __init__(self, df):
+        self.df = df
+        self._tau = {}  # (col, col) in column order -> correlation
+        self._lock = threading.Lock()
+
+    def _key(self, a, b):
+        return (a, b) if self.df.columns.get_loc(a) <= self.df.columns.get_loc(b) else (b, a)
+
+    def matrix(self, cols):
+        """Correlation and pairwise count matrices for cols"""
+        cols = list(cols)
+        with self._lock:
+            for i, a in enumerate(cols):
+                for b in cols[i + 1:]:
+                    key = self._key(a, b)
+                    if key not in self._tau:
+                        self._tau[key] = self.df[a].corr(self.df[b], method="kendall")
+            corr = np.array([[np.nan if a == b else self._tau[self._key(a, b)] for b in cols] for a in cols])
+        # Like DataFrame.corr(): 1 on the diagonal unless the column is constant
+        np.fill_diagonal(corr, [1.0 if self.df[col].nunique() > 1 else np.nan for col in cols])
+        notna = self.df[cols].notna().to_numpy(dtype=np.float64)
+        counts = pd.DataFrame((notna.T @ notna).astype(np.int64), index=cols, columns=cols)
+        return pd.DataFrame(corr, index=cols, columns=cols), counts
@@ -3,6 +3,17 @@ import pandas as pd
 import seaborn as sns
 import matplotlib.pyplot as plt
 import numpy as np
+import os
+
+from csv_store import DatasetStore, convert_datetime_columns, hash_bytes, read_csv_compact
+from data_profile import PairwiseKendall, build_profile, correlation_matrix
+from filter_index import FilterIndex
+from sketches import build_sketches
+from query_engine import HAS_DUCKDB, QueryEngine
+from paged_table import TableView, paged_table
+from shards import ShardIngestion, expand_shards
+from charts import (LARGE_DATA_ROWS, ColumnDistribution, FigureCache, binned_pair_histograms, is_large, plot_binned_pairs,
+                    plot_hexbin, stratified_sample)
 
 # Set page config
 st.set_page_config(page_title="CSV Analytics Dashboard", layout="wide")
@@ -28,30 +39,268 @@ st.markdown("""
 st.markdown("<h1 class='main-header'>📊 CSV Analytics Dashboard</h1>", unsafe_allow_html=True)
 st.markdown("Upload your CSV file to visualize and analyze your data.")
 
+
+
+# --- Dataset cache shared by all sessions ---
+@st.cache_resource
+def get_dataset_store():
+    return DatasetStore()
+
+
+def upload_key(uploaded_file):
+    """Content hash of an upload, computed once per uploaded file"""
+    hashes = st.session_state.setdefault("upload_hashes", {})
+    if uploaded_file.file_id not in hashes:
+        hashes[uploaded_file.file_id] = hash_bytes(uploaded_file.getvalue())
+    return hashes[uploaded_file.file_id]
+
+
+@st.cache_data(max_entries=8, show_spinner="Profiling columns...")
+def get_profile(dataset_key, _df):
+    """Column statistics for a dataset, computed once per dataset hash"""
+    return build_profile(_df)
+
+
+@st.cache_data(persist="disk", show_spinner="Building approximate statistics...")
+def get_sketches(dataset_key, _df):
+    """Mergeable sketches of a dataset, built in one pass and persisted with the cache"""
+    return build_sketches(_df)
+
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def get_approx_profile(dataset_key, _df):
+    """Sketch-backed profile and reservoir sample for the approximate-statistics mode"""
+    sketch = get_sketches(dataset_key, _df)
+    return sketch.to_profile(), sketch.sample(_df)
+
+
+@st.cache_resource
+def get_figure_cache():
+    return FigureCache()
+
+
+def show_figure(key, draw):
+    """Display a chart rendered through the shared figure cache"""
+    st.image(get_figure_cache().render((chart_key,) + tuple(key), draw), use_container_width=True)
+
+
+@st.cache_resource(max_entries=4)
+def get_query_engine(dataset_key, use_duckdb, _df):
+    """Columnar engine for Bar Chart and Box Plot aggregations over one dataset"""
+    return QueryEngine(_df, use_duckdb=use_duckdb)
+
+
+@st.cache_resource(max_entries=4)
+def get_filter_index(dataset_key, _df):
+    """Column indexes for the Data Filtering section, shared by every session on a dataset"""
+    return FilterIndex(_df)
+
+
+@st.cache_resource(max_entries=4)
+def get_table_view(dataset_key, _df):
+    """Server-side sort and search orders for the filtered-data grid"""
+    return TableView(_df)
+
+
+@st.cache_resource(max_entries=16, show_spinner=False)
+def get_distribution(dataset_key, col, _df):
+    """Sorted values and KDE of a numeric column; changing the bin count only re-bins"""
+    return ColumnDistribution(_df[col])
+
+
+@st.cache_data(max_entries=8, show_spinner="Computing correlation matrix...")
+def get_correlations(dataset_key, method, _df, num_cols):
+    """Correlation of every numeric column pair, computed once per dataset and method"""
+    return correlation_matrix(_df, num_cols, method=method)
+
+
+@st.cache_resource(max_entries=4)
+def get_kendall(dataset_key, _df):
+    """Kendall correlations of the column pairs selected so far, shared by every session"""
+    return PairwiseKendall(_df)
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def get_pair_histograms(dataset_key, pair_cols, hue_col, _plot_df):
+    """Binned pair-plot panels, computed once per dataset, column set and hue"""
+    return binned_pair_histograms(_plot_df, pair_cols, hue=hue_col)
+
+
+@st.cache_resource(max_entries=2, show_spinner=False)
+def get_shard_ingestion(shards_key, compact, _files):
+    """Background parse of a set of shard uploads, shared by reruns and sessions"""
+    return ShardIngestion(expand_shards([(f.name, f.getvalue()) for f in _files]), compact=compact)
+
+
+@st.fragment(run_every=1)
+def watch_ingestion(ingestion, finished):
+    """Rerun the app whenever another shard finishes parsing"""
+    if ingestion.progress()[0] != finished:
+        st.rerun()
+
+
+# Benchmarks and local runs can point the dashboard at a CSV on disk instead of an upload
+DATASET_PATH = os.environ.get("DASHBOARD_DATASET")
+
+
+def path_key(path):
+    """Cache key for a CSV on disk, based on its path, size and modification time"""
+    stat = os.stat(path)
+    return hash_bytes(f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+
+
+def show_memory_report(df):
+    """Caption comparing a compact-mode frame's memory with the plain parse"""
+    memory_report = df.attrs.get("memory_report") if df is not None else None
+    if not memory_report:
+        return
+    original_mb = memory_report["original_bytes"] / 1024 ** 2
+    compact_mb = memory_report["compact_bytes"] / 1024 ** 2
+    saved_pct = (1 - compact_mb / original_mb) * 100 if original_mb else 0
+    st.caption(f"Memory: {compact_mb:.1f} MB instead of {original_mb:.1f} MB "
+               f"(saved {original_mb - compact_mb:.1f} MB, {saved_pct:.0f}%)")
+
+
+# --- Dashboard sections ---
+SECTIONS = ["📊 Overview", "📈 Visualizations", "🔍 Detailed Analysis"]
+SECTION_KEY_PREFIXES = ("overview_", "viz_", "detail_")  # widget keys kept while a section is hidden
+
+
 # File uploader
-uploaded_file = st.file_uploader("Upload your CSV file", type=["csv"])
+multi_file = st.checkbox("Multiple files or zip archive", value=False,
+                         help="Upload sharded data, e.g. daily CSVs or a zip of them. Shards are parsed "
+                              "in parallel and can be explored while the rest are still loading")
+if multi_file:
+    uploaded_file = None
+    uploaded_shards = st.file_uploader("Upload your CSV shards or a zip archive", type=["csv", "zip"],
+                                       accept_multiple_files=True)
+else:
+    uploaded_shards = []
+    uploaded_file = st.file_uploader("Upload your CSV file", type=["csv"])
+compact_mode = st.checkbox("Compact memory mode", value=False,
+                           help="Parse in chunks, store low-cardinality text as category "
+                                "and downcast numbers to the smallest safe width")
+use_duckdb = HAS_DUCKDB and st.checkbox("Use DuckDB for aggregations", value=True,
+                                         help="Run Bar Chart and Box Plot aggregations in an embedded, "
+                                              "multi-threaded columnar engine")
+approx_mode = st.checkbox("Approximate statistics", value=False,
+                          help="For very large files: estimate cardinality, quantiles and top values "
+                               "from sketches and draw charts from a uniform row sample")
 
 # Initialize empty dataframe
 df = None
+dataset_key = None
 
 # Data processing
-if uploaded_file:
+source = uploaded_file or DATASET_PATH
+if uploaded_shards:
+    try:
+        shards_key = hash_bytes("".join(sorted(upload_key(f) for f in uploaded_shards)).encode())
+        base_key = shards_key + ("-compact" if compact_mode else "")
+        store = get_dataset_store()
+        ingestion = get_shard_ingestion(shards_key, compact_mode, uploaded_shards)
+        if ingestion.released and store.get(base_key) is None:
+            # The combined dataset was evicted after the shards were freed; parse them again
+            get_shard_ingestion.clear()
+            ingestion = get_shard_ingestion(shards_key, compact_mode, uploaded_shards)
+
+        finished, total = ingestion.progress()
+        ready = ingestion.ready()
+        if ingestion.done and not ready:
+            st.error("None of the shards could be loaded")
+        elif ingestion.done:
+            dataset_key = base_key
+            df = store.get_or_load(dataset_key, lambda: ingestion.combine(ready, release=True))
+            st.success(f"Successfully loaded {len(ready)} of {total} shards")
+        else:
+            st.progress(finished / total, text=f"Parsed {finished} of {total} shards")
+            watch_ingestion(ingestion, finished)
+            if ready:
+                # Explore the shards parsed so far; each new shard replaces this partial dataset,
+                # so it is kept in memory only rather than written to Parquet
+                dataset_key = f"{base_key}-partial{len(ready)}"
+                previous_key = st.session_state.get("partial_dataset_key")
+                if previous_key and previous_key != dataset_key:
+                    store.invalidate(previous_key)
+                st.session_state.partial_dataset_key = dataset_key
+                df = store.get_or_load(dataset_key, lambda: ingestion.combine(ready), spill=False)
+                st.info(f"Showing {len(ready)} of {total} shards while the rest are parsed")
+
+        with st.expander("Shards"):
+            st.dataframe(pd.DataFrame({"Shard": ingestion.names,
+                                       "Status": [ingestion.status(name) for name in ingestion.names]}),
+                         hide_index=True)
+
+        if compact_mode:
+            show_memory_report(df)
+    except Exception as e:
+        st.error(f"Error: {e}")
+elif source:
     try:
-        df = pd.read_csv(uploaded_file)
-        st.success(f"Successfully loaded {uploaded_file.name}")
+        # Parse each distinct file once; reruns and other sessions reuse the cached frame
+        if uploaded_file:
+            source_name, source_key = uploaded_file.name, upload_key(uploaded_file)
+        else:
+            source_name, source_key = os.path.basename(DATASET_PATH), path_key(DATASET_PATH)
+        dataset_key = source_key + ("-compact" if compact_mode else "")
+        reader = read_csv_compact if compact_mode else pd.read_csv
+        # Date detection runs once at ingestion, so the cached frame already holds datetime64 columns
+        df = get_dataset_store().get_or_load(dataset_key,
+                                             lambda: convert_datetime_columns(reader(source)))
+        st.success(f"Successfully loaded {source_name}")
+
+        if compact_mode:
+            show_memory_report(df)
     except Exception as e:
         st.error(f"Error: {e}")
 
 # Main analysis section
 if df is not None:
-    # Create tabs for different analyses
-    tab1, tab2, tab3 = st.tabs(["📊 Overview", "📈 Visualizations", "🔍 Detailed Analysis"])
+    if approx_mode:
+        # Statistics come from sketches and charts from a reservoir sample of the rows
+        profile, chart_df = get_approx_profile(dataset_key, df)
+        chart_key = f"{dataset_key}-approx"
+    else:
+        profile = get_profile(dataset_key, df)
+        chart_df, chart_key = df, dataset_key
+    # Judged on the source rows: the reservoir sample in approximate mode is
+    # below the threshold but still too many points to draw one by one
+    large_data = is_large(df)
+
+    # Identify column types
+    num_cols = profile.numeric_columns
+    cat_cols = df.select_dtypes(include=['object', 'category', 'bool']).columns.tolist()
+    date_cols = df.select_dtypes(include=['datetime', 'datetimetz']).columns.tolist()
+
+    # Lazy navigation: unlike st.tabs, only the active section's code runs on a rerun
+    active_section = st.radio("Section", SECTIONS, horizontal=True, key="active_section",
+                              label_visibility="collapsed")
+
+    # Hidden sections render no widgets, and Streamlit would drop their state.
+    # Re-assigning the values keeps each section's settings, so switching back
+    # hits the profile, correlation and figure caches instead of rebuilding.
+    # Settings refer to columns of one dataset, so a new upload starts from defaults.
+    dataset_changed = st.session_state.get("section_dataset") != dataset_key
+    st.session_state.section_dataset = dataset_key
+    for state_key in list(st.session_state):
+        if state_key.startswith(SECTION_KEY_PREFIXES):
+            if dataset_changed:
+                del st.session_state[state_key]
+            else:
+                st.session_state[state_key] = st.session_state[state_key]
+
+    if profile.approximate:
+        st.caption(f"Approximate statistics — unique values {profile.error_bounds['unique']}"
+                   + "".join(f"; {name} {bound}" for name, bound in profile.error_bounds.items()
+                             if name != 'unique')
+                   + f". Charts use a uniform sample of {len(chart_df):,} of {profile.rows:,} rows.")
 
-    with tab1:
+    if active_section == SECTIONS[0]:
         st.markdown("<h2 class='section-header'>Data Preview</h2>", unsafe_allow_html=True)
 
         # Add row count slider
-        preview_rows = st.slider("Number of rows to preview", 1, min(50, df.shape[0]), 5)
+        preview_rows = st.slider("Number of rows to preview", 1, min(50, df.shape[0]), 5,
+                                 key="overview_preview_rows")
         st.dataframe(df.head(preview_rows))
 
         # Data info in columns
@@ -64,20 +313,16 @@ if df is not None:
 
             # Missing values analysis
             st.markdown("<h3 class='section-header'>Missing Values</h3>", unsafe_allow_html=True)
-            missing = df.isnull().sum()
-            missing_percent = (missing / len(df)) * 100
-            missing_df = pd.DataFrame({
-                'Missing Values': missing,
-                'Percentage (%)': missing_percent.round(2)
-            })
+            missing_df = profile.missing().rename(columns={'missing': 'Missing Values',
+                                                           'missing_pct': 'Percentage (%)'})
             st.dataframe(missing_df[missing_df['Missing Values'] > 0].sort_values(by='Missing Values', ascending=False))
 
         with col2:
             st.markdown("<h3 class='section-header'>Column Types</h3>", unsafe_allow_html=True)
             types_df = pd.DataFrame({
                 'Column': df.columns,
-                'Type': df.dtypes.astype(str),
-                'Unique Values': [df[col].nunique() for col in df.columns]
+                'Type': profile.summary['dtype'],
+                'Unique Values': profile.summary['unique'].astype(int)
             })
             st.dataframe(types_df)
 
@@ -85,280 +330,363 @@ if df is not None:
         st.markdown("<h3 class='section-header'>Summary Statistics</h3>", unsafe_allow_html=True)
 
         # Let user choose columns for summary
-        all_cols = st.checkbox("Show all columns", value=True)
+        all_cols = st.checkbox("Show all columns", value=True, key="overview_all_cols")
         if all_cols:
             selected_cols = df.columns.tolist()
         else:
             selected_cols = st.multiselect("Select columns for summary", df.columns.tolist(),
-                                           default=df.select_dtypes(include=['number']).columns.tolist()[:5])
+                                           default=profile.numeric_columns[:5], key="overview_summary_cols")
 
         if selected_cols:
-            st.dataframe(df[selected_cols].describe(include='all').T)
+            st.dataframe(profile.describe(selected_cols))
 
-    with tab2:
+    elif active_section == SECTIONS[1]:
         st.markdown("<h2 class='section-header'>Data Visualization</h2>", unsafe_allow_html=True)
 
-        # Identify column types
-        num_cols = df.select_dtypes(include=['float64', 'int64']).columns.tolist()
-        cat_cols = df.select_dtypes(include=['object', 'category', 'bool']).columns.tolist()
-        date_cols = [col for col in df.columns if df[col].dtype == 'datetime64[ns]' or
-                     (df[col].dtype == 'object' and pd.to_datetime(df[col], errors='coerce').notna().all())]
-
         viz_type = st.selectbox("Select Visualization Type",
                                 ["Histogram", "Scatter Plot", "Bar Chart", "Box Plot",
-                                 "Correlation Heatmap", "Pair Plot"])
+                                 "Correlation Heatmap", "Pair Plot"], key="viz_type")
 
         if viz_type == "Histogram" and num_cols:
-            col = st.selectbox("Select column for histogram", num_cols)
-            bins = st.slider("Number of bins", 5, 100, 20)
+            col = st.selectbox("Select column for histogram", num_cols, key="viz_hist_col")
+            bins = st.slider("Number of bins", 5, 100, 20, key="viz_hist_bins")
 
-            fig, ax = plt.subplots(figsize=(10, 6))
-            sns.histplot(df[col].dropna(), kde=True, bins=bins, ax=ax)
-            ax.set_title(f'Histogram of {col}')
-            ax.set_xlabel(col)
-            ax.set_ylabel('Frequency')
-            st.pyplot(fig)
+            def draw_histogram():
+                fig, ax = plt.subplots(figsize=(10, 6))
+                get_distribution(chart_key, col, chart_df).plot(ax, bins=bins)
+                ax.set_title(f'Histogram of {col}')
+                ax.set_xlabel(col)
+                ax.set_ylabel('Frequency')
+                return fig
+
+            show_figure((viz_type, col, bins), draw_histogram)
 
         elif viz_type == "Scatter Plot" and len(num_cols) >= 2:
             col1, col2 = st.columns(2)
             with col1:
-                x_col = st.selectbox("X-axis for scatterplot", num_cols)
+                x_col = st.selectbox("X-axis for scatterplot", num_cols, key="viz_scatter_x")
             with col2:
-                y_col = st.selectbox("Y-axis for scatterplot", [c for c in num_cols if c != x_col])
+                if st.session_state.get("viz_scatter_y") == x_col:
+                    del st.session_state["viz_scatter_y"]
+                y_col = st.selectbox("Y-axis for scatterplot", [c for c in num_cols if c != x_col],
+                                     key="viz_scatter_y")
 
             color_option = None
             if cat_cols:
-                use_color = st.checkbox("Color by category", value=False)
+                use_color = st.checkbox("Color by category", value=False, key="viz_scatter_use_color")
                 if use_color:
-                    color_option = st.selectbox("Select category for color", cat_cols)
+                    color_option = st.selectbox("Select category for color", cat_cols, key="viz_scatter_color")
 
-            fig, ax = plt.subplots(figsize=(10, 6))
-            if color_option:
-                sns.scatterplot(data=df, x=x_col, y=y_col, hue=color_option, ax=ax)
-                plt.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
-            else:
-                sns.scatterplot(data=df, x=x_col, y=y_col, ax=ax)
+            # Large datasets are drawn from aggregated or sampled data instead of every row
+            render_mode = "All points"
+            if large_data:
+                modes = ["Stratified sample", "Density (hexbin)"] if color_option else \
+                    ["Density (hexbin)", "Stratified sample"]
+                render_mode = st.radio(f"Large dataset rendering (over {LARGE_DATA_ROWS:,} rows)", modes,
+                                       horizontal=True, key="viz_scatter_render_mode")
 
-            ax.set_title(f'{y_col} vs {x_col}')
-            plt.tight_layout()
-            st.pyplot(fig)
+            def draw_scatter():
+                fig, ax = plt.subplots(figsize=(10, 6))
+                if render_mode == "Density (hexbin)":
+                    mappable = plot_hexbin(ax, chart_df, x_col, y_col)
+                    fig.colorbar(mappable, ax=ax, label='Count (log scale)')
+                    ax.set_xlabel(x_col)
+                    ax.set_ylabel(y_col)
+                    mode_note = f"hexbin density of {len(chart_df):,} rows"
+                else:
+                    plot_df = chart_df
+                    mode_note = f"all {len(chart_df):,} points"
+                    if render_mode == "Stratified sample":
+                        plot_df = stratified_sample(chart_df, hue=color_option)
+                        mode_note = f"stratified sample of {len(plot_df):,} / {len(chart_df):,} rows"
+                    if color_option:
+                        sns.scatterplot(data=plot_df, x=x_col, y=y_col, hue=color_option, ax=ax)
+                        ax.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
+                    else:
+                        sns.scatterplot(data=plot_df, x=x_col, y=y_col, ax=ax)
+
+                ax.set_title(f'{y_col} vs {x_col} ({mode_note})')
+                fig.tight_layout()
+                return fig
+
+            show_figure((viz_type, x_col, y_col, color_option, render_mode), draw_scatter)
 
         elif viz_type == "Bar Chart" and cat_cols:
-            cat_col = st.selectbox("Select categorical column", cat_cols)
+            cat_col = st.selectbox("Select categorical column", cat_cols, key="viz_bar_cat")
 
             # Option for count or aggregating by a numeric column
-            agg_option = st.radio("Select aggregation", ["Count", "Mean of numeric column", "Sum of numeric column"])
+            agg_option = st.radio("Select aggregation", ["Count", "Mean of numeric column", "Sum of numeric column"],
+                                  key="viz_bar_agg")
 
-            fig, ax = plt.subplots(figsize=(10, 6))
+            num_col = None
+            if agg_option != "Count":
+                if num_cols:
+                    num_col = st.selectbox("Select numeric column", num_cols, key="viz_bar_num")
+                else:
+                    st.warning("No numeric columns available for aggregation")
 
-            if agg_option == "Count":
-                value_counts = df[cat_col].value_counts().sort_values(ascending=False)
+            # Limit categories if there are too many
+            if profile.unique(cat_col) > 15 and (agg_option == "Count" or num_col):
+                st.warning(f"Showing only top 15 categories out of {profile.unique(cat_col)}")
 
-                # Limit categories if there are too many
-                if len(value_counts) > 15:
-                    st.warning(f"Showing only top 15 categories out of {len(value_counts)}")
-                    value_counts = value_counts.head(15)
+            query_engine = get_query_engine(chart_key, use_duckdb, chart_df)
 
-                value_counts.plot(kind='bar', ax=ax)
-                ax.set_title(f'Count of {cat_col}')
-                ax.set_ylabel('Count')
-            else:
-                if num_cols:
-                    num_col = st.selectbox("Select numeric column", num_cols)
+            def draw_bar_chart():
+                fig, ax = plt.subplots(figsize=(10, 6))
 
+                if agg_option == "Count":
+                    profile.value_counts[cat_col].head(15).plot(kind='bar', ax=ax)
+                    ax.set_title(f'Count of {cat_col}')
+                    ax.set_ylabel('Count')
+                elif num_col:
+                    # Group-by and top-15 run in the query engine; only the summary comes back
                     if agg_option == "Mean of numeric column":
-                        agg_df = df.groupby(cat_col)[num_col].mean().sort_values(ascending=False)
+                        agg_df, _ = query_engine.group_aggregate(cat_col, num_col, "mean", limit=15)
                         title = f'Mean {num_col} by {cat_col}'
                         ylabel = f'Mean {num_col}'
                     else:  # Sum
-                        agg_df = df.groupby(cat_col)[num_col].sum().sort_values(ascending=False)
+                        agg_df, _ = query_engine.group_aggregate(cat_col, num_col, "sum", limit=15)
+                        # A sample's sums are scaled up to estimate the full-data totals
+                        agg_df *= profile.rows / max(len(chart_df), 1)
                         title = f'Sum of {num_col} by {cat_col}'
                         ylabel = f'Sum of {num_col}'
 
-                    # Limit categories if there are too many
-                    if len(agg_df) > 15:
-                        st.warning(f"Showing only top 15 categories out of {len(agg_df)}")
-                        agg_df = agg_df.head(15)
-
                     agg_df.plot(kind='bar', ax=ax)
                     ax.set_title(title)
                     ax.set_ylabel(ylabel)
-                else:
-                    st.warning("No numeric columns available for aggregation")
 
-            plt.tight_layout()
-            st.pyplot(fig)
+                fig.tight_layout()
+                return fig
+
+            show_figure((viz_type, cat_col, agg_option, num_col, query_engine.name), draw_bar_chart)
+            if num_col:
+                st.caption(f"Aggregated with {query_engine.name}")
 
         elif viz_type == "Box Plot":
             if num_cols:
-                num_col = st.selectbox("Select numeric column for box plot", num_cols)
+                num_col = st.selectbox("Select numeric column for box plot", num_cols, key="viz_box_num")
 
                 group_by = None
                 if cat_cols:
-                    use_grouping = st.checkbox("Group by category", value=False)
+                    use_grouping = st.checkbox("Group by category", value=False, key="viz_box_use_group")
                     if use_grouping:
-                        group_by = st.selectbox("Select category for grouping", cat_cols)
-
-                fig, ax = plt.subplots(figsize=(10, 6))
+                        group_by = st.selectbox("Select category for grouping", cat_cols, key="viz_box_group")
 
                 if group_by:
                     # Limit categories if there are too many
-                    categories = df[group_by].unique()
-                    if len(categories) > 10:
-                        st.warning(f"Too many categories ({len(categories)}). Showing only top 10 by frequency.")
-                        top_cats = df[group_by].value_counts().nlargest(10).index.tolist()
-                        plot_df = df[df[group_by].isin(top_cats)]
+                    n_categories = profile.unique(group_by) + (profile.stat(group_by, 'missing') > 0)
+                    if n_categories > 10:
+                        st.warning(f"Too many categories ({n_categories}). Showing only top 10 by frequency.")
+
+                query_engine = get_query_engine(chart_key, use_duckdb, chart_df)
+
+                def draw_box_plot():
+                    # Quartiles and whiskers are precomputed, so only the box summaries are drawn
+                    box_stats = query_engine.box_stats(num_col, group_by, top_k=10)
+                    fig, ax = plt.subplots(figsize=(10, 6))
+                    ax.bxp(box_stats, showfliers=False, patch_artist=True,
+                           boxprops={'facecolor': sns.color_palette()[0], 'alpha': 0.8})
+
+                    if group_by:
+                        ax.set_xlabel(group_by)
+                        ax.set_ylabel(num_col)
+                        ax.tick_params(axis='x', labelrotation=45)
+                        ax.set_title(f'Box Plot of {num_col} by {group_by}')
                     else:
-                        plot_df = df
+                        ax.set_ylabel(num_col)
+                        ax.set_title(f'Box Plot of {num_col}')
 
-                    sns.boxplot(x=group_by, y=num_col, data=plot_df, ax=ax)
-                    plt.xticks(rotation=45)
-                    ax.set_title(f'Box Plot of {num_col} by {group_by}')
-                else:
-                    sns.boxplot(y=df[num_col], ax=ax)
-                    ax.set_title(f'Box Plot of {num_col}')
+                    fig.tight_layout()
+                    return fig
 
-                plt.tight_layout()
-                st.pyplot(fig)
+                show_figure((viz_type, num_col, group_by, query_engine.name), draw_box_plot)
+                st.caption(f"Quartiles and 1.5 IQR whiskers computed with {query_engine.name}; outliers not drawn")
             else:
                 st.warning("No numeric columns available for box plot")
 
         elif viz_type == "Correlation Heatmap" and len(num_cols) >= 2:
             # Allow user to select columns for correlation
             corr_cols = st.multiselect("Select columns for correlation matrix", num_cols,
-                                       default=num_cols[:min(len(num_cols), 8)])
+                                       default=num_cols[:min(len(num_cols), 8)], key="viz_corr_cols")
+
+            corr_method = st.radio("Correlation method", ["Pearson", "Spearman", "Kendall"], horizontal=True,
+                                   key="viz_corr_method")
 
             if corr_cols and len(corr_cols) >= 2:
-                fig, ax = plt.subplots(figsize=(10, 8))
-                corr_matrix = df[corr_cols].corr()
-                mask = np.triu(np.ones_like(corr_matrix, dtype=bool))
-                sns.heatmap(corr_matrix, mask=mask, annot=True, cmap='coolwarm',
-                            linewidths=0.5, ax=ax, fmt=".2f", annot_kws={"size": 8})
-                plt.tight_layout()
-                st.pyplot(fig)
+                if corr_method == "Kendall":
+                    # Too slow for every pair of a wide dataset: compute only selected pairs not seen yet
+                    with st.spinner("Computing Kendall correlations..."):
+                        corr_matrix, pair_counts = get_kendall(chart_key, chart_df).matrix(corr_cols)
+                else:
+                    # The full matrix is cached; changing the selection only slices it
+                    full_corr, pair_counts = get_correlations(chart_key, corr_method.lower(), chart_df, num_cols)
+                    corr_matrix = full_corr.loc[corr_cols, corr_cols]
+                st.caption(f"{corr_method} correlation over pairwise complete rows "
+                           f"(at least {pair_counts.loc[corr_cols, corr_cols].to_numpy().min():,} per pair)")
+
+                def draw_heatmap():
+                    fig, ax = plt.subplots(figsize=(10, 8))
+                    mask = np.triu(np.ones_like(corr_matrix, dtype=bool))
+                    sns.heatmap(corr_matrix, mask=mask, annot=True, cmap='coolwarm',
+                                linewidths=0.5, ax=ax, fmt=".2f", annot_kws={"size": 8})
+                    fig.tight_layout()
+                    return fig
+
+                show_figure((viz_type, corr_method, tuple(corr_cols)), draw_heatmap)
             else:
                 st.warning("Please select at least 2 columns for correlation matrix")
 
         elif viz_type == "Pair Plot" and len(num_cols) >= 2:
             # Allow user to select a subset of columns
             pair_cols = st.multiselect("Select columns for pair plot", num_cols,
-                                       default=num_cols[:min(len(num_cols), 4)])
+                                       default=num_cols[:min(len(num_cols), 4)], key="viz_pair_cols")
 
             hue_col = None
             if cat_cols:
-                use_hue = st.checkbox("Color by category", value=False)
+                use_hue = st.checkbox("Color by category", value=False, key="viz_pair_use_hue")
                 if use_hue:
-                    hue_col = st.selectbox("Select category for color", cat_cols)
+                    hue_col = st.selectbox("Select category for color", cat_cols, key="viz_pair_hue")
 
             if pair_cols and len(pair_cols) >= 2:
                 if len(pair_cols) > 4:
                     st.warning("Using many columns in pair plot may slow down the dashboard")
 
-                with st.spinner("Generating pair plot..."):
-                    if hue_col:
-                        # Limit categories if there are too many
-                        if df[hue_col].nunique() > 5:
-                            st.warning(f"Too many categories in {hue_col}. Using only top 5 categories.")
-                            top_cats = df[hue_col].value_counts().nlargest(5).index.tolist()
-                            plot_df = df[df[hue_col].isin(top_cats)]
-                        else:
-                            plot_df = df
-
-                        fig = sns.pairplot(plot_df, vars=pair_cols, hue=hue_col, height=2.5)
+                # Limit categories if there are too many
+                limit_hue = bool(hue_col) and profile.unique(hue_col) > 5
+                if limit_hue:
+                    st.warning(f"Too many categories in {hue_col}. Using only top 5 categories.")
+
+                def draw_pair_plot():
+                    plot_df = chart_df
+                    if limit_hue:
+                        top_cats = profile.value_counts[hue_col].head(5).index.tolist()
+                        plot_df = chart_df[chart_df[hue_col].isin(top_cats)]
+
+                    if is_large(plot_df) or (approx_mode and large_data):
+                        # Panels are drawn from cached 2D histograms rather than raw points
+                        hists = get_pair_histograms(chart_key, pair_cols, hue_col, plot_df)
+                        fig = plt.figure(figsize=(2.5 * len(pair_cols), 2.5 * len(pair_cols)))
+                        plot_binned_pairs(fig, hists, pair_cols)
+                        fig.suptitle(f"Binned density of {len(plot_df):,} rows"
+                                     + (" (hue on diagonal only)" if hue_col else ""))
+                    elif hue_col:
+                        fig = sns.pairplot(plot_df, vars=pair_cols, hue=hue_col, height=2.5).figure
                     else:
-                        fig = sns.pairplot(df, vars=pair_cols, height=2.5)
+                        fig = sns.pairplot(plot_df, vars=pair_cols, height=2.5).figure
+
+                    fig.tight_layout()
+                    return fig
 
-                    plt.tight_layout()
-                    st.pyplot(fig)
+                with st.spinner("Generating pair plot..."):
+                    show_figure((viz_type, tuple(pair_cols), hue_col), draw_pair_plot)
             else:
                 st.warning("Please select at least 2 columns for pair plot")
 
-    with tab3:
+    elif active_section == SECTIONS[2]:
         st.markdown("<h2 class='section-header'>Detailed Analysis</h2>", unsafe_allow_html=True)
 
         # Add column filter
         st.markdown("<h3 class='section-header'>Column Analysis</h3>", unsafe_allow_html=True)
-        selected_col = st.selectbox("Select column to analyze", df.columns.tolist())
+        selected_col = st.selectbox("Select column to analyze", df.columns.tolist(), key="detail_column")
+        selected_numeric = selected_col in num_cols
 
         col1, col2 = st.columns(2)
 
         with col1:
             # Basic column stats
             st.markdown(f"**Basic Statistics for {selected_col}**")
-            if df[selected_col].dtype in ['int64', 'float64']:
+            if selected_numeric:
+                col_min, col_max = profile.stat(selected_col, 'min'), profile.stat(selected_col, 'max')
                 stats = pd.DataFrame({
                     'Statistic': ['Mean', 'Median', 'Std Dev', 'Min', 'Max', 'Range'],
                     'Value': [
-                        round(df[selected_col].mean(), 2),
-                        round(df[selected_col].median(), 2),
-                        round(df[selected_col].std(), 2),
-                        round(df[selected_col].min(), 2),
-                        round(df[selected_col].max(), 2),
-                        round(df[selected_col].max() - df[selected_col].min(), 2)
+                        round(profile.stat(selected_col, 'mean'), 2),
+                        round(profile.stat(selected_col, '50%'), 2),
+                        round(profile.stat(selected_col, 'std'), 2),
+                        round(col_min, 2),
+                        round(col_max, 2),
+                        round(col_max - col_min, 2)
                     ]
                 })
                 st.dataframe(stats, hide_index=True)
             else:
+                most_common = profile.value_counts[selected_col]
+                least_common = profile.least_common.get(selected_col)
+                missing_count = profile.stat(selected_col, 'missing')
                 stats = pd.DataFrame({
                     'Statistic': ['Unique Values', 'Most Common', 'Least Common', 'Missing Values'],
                     'Value': [
-                        df[selected_col].nunique(),
-                        f"{df[selected_col].value_counts().index[0]} ({df[selected_col].value_counts().iloc[0]})" if not
-                        df[selected_col].value_counts().empty else "N/A",
-                        f"{df[selected_col].value_counts().index[-1]} ({df[selected_col].value_counts().iloc[-1]})" if not
-                        df[selected_col].value_counts().empty else "N/A",
-                        f"{df[selected_col].isnull().sum()} ({round(df[selected_col].isnull().sum() / len(df) * 100, 2)}%)"
+                        profile.unique(selected_col),
+                        f"{most_common.index[0]} ({most_common.iloc[0]})" if not most_common.empty else "N/A",
+                        f"{least_common[0]} ({least_common[1]})" if least_common else "N/A",
+                        f"{missing_count} ({profile.stat(selected_col, 'missing_pct')}%)"
                     ]
                 })
                 st.dataframe(stats, hide_index=True)
 
         with col2:
             # Visualization based on column type
-            if df[selected_col].dtype in ['int64', 'float64']:
-                fig, ax = plt.subplots(figsize=(8, 4))
-                sns.histplot(df[selected_col].dropna(), kde=True, ax=ax)
-                ax.set_title(f'Distribution of {selected_col}')
-                st.pyplot(fig)
-            else:
-                # For categorical, show bar chart of top categories
-                value_counts = df[selected_col].value_counts().head(10)
+            def draw_column_plot():
                 fig, ax = plt.subplots(figsize=(8, 4))
-                value_counts.plot(kind='bar', ax=ax)
-                ax.set_title(f'Top 10 values in {selected_col}')
-                plt.xticks(rotation=45)
-                plt.tight_layout()
-                st.pyplot(fig)
+                if selected_numeric:
+                    get_distribution(chart_key, selected_col, chart_df).plot(ax)
+                    ax.set_title(f'Distribution of {selected_col}')
+                else:
+                    # For categorical, show bar chart of top categories
+                    profile.value_counts[selected_col].head(10).plot(kind='bar', ax=ax)
+                    ax.set_title(f'Top 10 values in {selected_col}')
+                    ax.tick_params(axis='x', labelrotation=45)
+                    fig.tight_layout()
+                return fig
+
+            show_figure(("Column Analysis", selected_col), draw_column_plot)
 
         # Show unique values for categorical columns
-        if df[selected_col].dtype not in ['int64', 'float64'] and df[selected_col].nunique() < 100:
+        if not selected_numeric and profile.unique(selected_col) < 100:
             st.markdown("<h3 class='section-header'>Unique Values</h3>", unsafe_allow_html=True)
-            unique_vals = pd.DataFrame(df[selected_col].value_counts()).reset_index()
+            unique_vals = pd.DataFrame(profile.value_counts[selected_col]).reset_index()
             unique_vals.columns = [selected_col, 'Count']
-            unique_vals['Percentage'] = round(unique_vals['Count'] / len(df) * 100, 2)
+            unique_vals['Percentage'] = round(unique_vals['Count'] / profile.rows * 100, 2)
             st.dataframe(unique_vals)
 
         # Add data filtering
         st.markdown("<h3 class='section-header'>Data Filtering</h3>", unsafe_allow_html=True)
-        filter_col = st.selectbox("Select column for filtering", df.columns.tolist(), key="filter_col")
-
-        if df[filter_col].dtype in ['int64', 'float64']:
-            min_val, max_val = float(df[filter_col].min()), float(df[filter_col].max())
-            filter_range = st.slider(f"Filter range for {filter_col}", min_val, max_val, (min_val, max_val))
-            filtered_df = df[(df[filter_col] >= filter_range[0]) & (df[filter_col] <= filter_range[1])]
-        else:
-            filter_values = st.multiselect(f"Select values for {filter_col}", df[filter_col].unique())
-            if filter_values:
-                filtered_df = df[df[filter_col].isin(filter_values)]
+        filter_cols = st.multiselect("Select columns for filtering", df.columns.tolist(),
+                                     default=df.columns.tolist()[:1], key="detail_filter_cols")
+
+        # Filters are answered from per-column indexes instead of rescanning the frame
+        filter_index = get_filter_index(dataset_key, df)
+        filters = {}
+        for filter_col in filter_cols:
+            if filter_col in num_cols:
+                min_val, max_val = float(profile.stat(filter_col, 'min')), float(profile.stat(filter_col, 'max'))
+                filters[filter_col] = st.slider(f"Filter range for {filter_col}", min_val, max_val,
+                                                (min_val, max_val), key=f"detail_filter_range_{filter_col}")
             else:
-                filtered_df = df
+                filter_values = st.multiselect(f"Select values for {filter_col}", filter_index.options(filter_col),
+                                               key=f"detail_filter_values_{filter_col}")
+                if filter_values:
+                    filters[filter_col] = filter_values
+
+        filter_bitmap, filter_counts = filter_index.apply(filters)
+        match_count = filter_index.matches(filter_bitmap)
 
-        st.markdown(f"Filtered data contains **{len(filtered_df)}** rows")
-        st.dataframe(filtered_df.head(10))
+        if len(filter_counts) > 1:
+            st.caption(" · ".join(f"{col}: {count:,} rows" for col, count in filter_counts.items()))
+        st.markdown(f"Filtered data contains **{match_count}** rows")
+        st.dataframe(filter_index.rows(filter_bitmap, limit=10))
 
-        if len(filtered_df) < len(df):
-            show_all_filtered = st.checkbox("Show all filtered data")
+        if match_count < len(df):
+            show_all_filtered = st.checkbox("Show all filtered data", key="detail_show_all")
             if show_all_filtered:
-                st.dataframe(filtered_df)
+                # Paged on the server: only the visible page is sent to the browser
+                paged_table(get_table_view(dataset_key, df), "detail_table",
+                            positions=filter_index.positions(filter_bitmap))
+
+    # Figure cache usage, shared across sessions
+    figure_stats = get_figure_cache().stats()
+    st.sidebar.caption(f"Figure cache: {figure_stats['hits']} hits / {figure_stats['misses']} misses, "
+                       f"{figure_stats['entries']} charts ({figure_stats['bytes'] / 1024 ** 2:.1f} MB)")
 
 else:
     # Instructions when no data is loaded
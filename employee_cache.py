@@ -0,0 +1,312 @@
+import json
+import select
+import threading
+import time
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import psycopg2
+from psycopg2 import extensions
+
+# --- Refresh settings ---
+PAGE_ROWS = 50_000  # rows per keyset page on the initial load
+FETCH_ROWS = 5_000  # rows per round trip from the server-side cursor
+REFRESH_INTERVAL_S = 5
+# Re-read rows changed shortly before the watermark, to catch transactions
+# that committed late and writers whose clocks lag behind ours
+WATERMARK_OVERLAP = timedelta(seconds=60)
+
+# --- Change notification settings ---
+NOTIFY_CHANNEL = "employee_changes"
+LISTEN_TIMEOUT_S = 5
+NOTIFY_BATCH_S = 0.1  # gather notifications from one bulk statement into one patch
+RECONNECT_BACKOFF_S = [1, 2, 5, 10, 30]
+
+
+class EmployeeSnapshot:
+    """Cached copy of hr.employee, kept current by incremental refreshes.
+
+    The first load walks the table in emp_id order with keyset pagination;
+    afterwards only rows whose changed_time is past the watermark are fetched
+    and merged. A cheap count/id-sum check detects deletes and inserts that
+    don't set changed_time, and only then are the ids reconciled. Each merge
+    builds a new frame, so callers can keep using the one they were given.
+
+    While an EmployeeListener is connected, the snapshot is patched from
+    change notifications and not refreshed on a timer at all.
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.df = None  # indexed by emp_id, ordered by emp_id
+        self.watermark = None
+        self.version = 0
+        self.refreshed_at = 0.0
+        self.listening = False
+        self.stats = {"full_loads": 0, "refreshes": 0, "patches": 0, "rows_fetched": 0, "rows_deleted": 0}
+        self._lock = threading.Lock()
+
+    def get(self, max_age=REFRESH_INTERVAL_S):
+        """The current table, refreshed first if it is older than max_age seconds.
+
+        Notifications keep the table current while listening, so only
+        max_age=0 forces a refresh then.
+        """
+        with self._lock:
+            if self.df is None:
+                self._full_load()
+            elif max_age <= 0 or (not self.listening and time.monotonic() - self.refreshed_at >= max_age):
+                self._refresh()
+            return self.df
+
+    def set_listening(self, listening):
+        """Switch between notification-driven and timed refreshes"""
+        with self._lock:
+            # Changes made while nobody was listening are caught by one delta refresh
+            if listening and self.df is not None:
+                self._refresh()
+            self.listening = listening
+
+    def patch(self, changed_ids, deleted_ids):
+        """Re-read only the given rows and drop deleted ones"""
+        with self._lock:
+            if self.df is None:
+                return
+            df = self.df.drop(index=list(deleted_ids), errors="ignore")
+            if changed_ids:
+                with self.pool.connection() as conn, conn.cursor() as cur:
+                    cur.execute("SELECT * FROM hr.employee WHERE emp_id = ANY(%s)", (sorted(changed_ids),))
+                    changed = self._frame(cur.fetchall(), [d.name for d in cur.description])
+                    conn.rollback()
+                # Rows deleted again before we read them
+                gone = [emp_id for emp_id in changed_ids if emp_id not in changed.index]
+                df = self._merge(df.drop(index=gone, errors="ignore"), changed)
+                self._advance_watermark(changed)
+            self.df = df
+            self.version += 1
+            self.stats["patches"] += 1
+
+    def reload(self):
+        with self._lock:
+            self._full_load()
+
+    def _frame(self, rows, columns):
+        df = pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+        df["changed_by"] = df["changed_by"].fillna("")
+        df["reason"] = df["reason"].fillna("")
+        df.index = df["emp_id"].to_numpy()
+        self.stats["rows_fetched"] += len(df)
+        return df
+
+    def _advance_watermark(self, df):
+        latest = df["changed_time"].max() if len(df) else None
+        if latest is not None and not pd.isna(latest):
+            self.watermark = latest if self.watermark is None else max(self.watermark, latest)
+
+    def _full_load(self):
+        pages = []
+        last_id = None
+        with self.pool.connection() as conn:
+            while True:
+                # Server-side cursor: the page streams in FETCH_ROWS batches
+                with conn.cursor(name="employee_page") as cur:
+                    cur.itersize = FETCH_ROWS
+                    if last_id is None:
+                        cur.execute("SELECT * FROM hr.employee ORDER BY emp_id LIMIT %s", (PAGE_ROWS,))
+                    else:
+                        cur.execute("SELECT * FROM hr.employee WHERE emp_id > %s ORDER BY emp_id LIMIT %s",
+                                    (last_id, PAGE_ROWS))
+                    rows = list(cur)
+                    columns = [d.name for d in cur.description]
+                if rows:
+                    pages.append(self._frame(rows, columns))
+                    last_id = int(pages[-1]["emp_id"].iloc[-1])  # psycopg2 can't adapt numpy ints
+                if len(rows) < PAGE_ROWS:
+                    break
+            conn.rollback()  # end the read transaction the named cursors needed
+
+        self.df = pd.concat(pages) if pages else self._frame([], columns)
+        self._advance_watermark(self.df)
+        self.version += 1
+        self.refreshed_at = time.monotonic()
+        self.stats["full_loads"] += 1
+
+    def _merge(self, df, changed):
+        """df with changed rows replaced or added, kept in emp_id order"""
+        if changed.empty:
+            return df
+        kept = df.drop(index=changed.index, errors="ignore")
+        return pd.concat([kept, changed]).sort_index()
+
+    def _refresh(self):
+        df = self.df
+        with self.pool.connection() as conn, conn.cursor() as cur:
+            if self.watermark is None:
+                cur.execute("SELECT * FROM hr.employee WHERE changed_time IS NOT NULL")
+            else:
+                cur.execute("SELECT * FROM hr.employee WHERE changed_time > %s",
+                            (self.watermark - WATERMARK_OVERLAP,))
+            changed = self._frame(cur.fetchall(), [d.name for d in cur.description])
+            # Rows from the overlap window that are already current don't make a new version
+            known = changed.index.isin(df.index)
+            same = np.zeros(len(changed), dtype=bool)
+            same[known] = (df.loc[changed.index[known], "changed_time"].to_numpy()
+                           == changed.loc[known, "changed_time"].to_numpy())
+            changed = changed[~same]
+            self._advance_watermark(changed)
+            merged = self._merge(df, changed)
+
+            cur.execute("SELECT count(*), coalesce(sum(emp_id), 0) FROM hr.employee")
+            count, id_sum = cur.fetchone()
+            if (count, id_sum) != (len(merged), int(merged["emp_id"].sum())):
+                # Deletes, or inserts that didn't set changed_time: reconcile the ids
+                cur.execute("SELECT emp_id FROM hr.employee")
+                ids = pd.Index(np.fromiter((row[0] for row in cur), dtype=np.int64))
+                deleted = merged.index.difference(ids)
+                merged = merged.drop(index=deleted)
+                self.stats["rows_deleted"] += len(deleted)
+                missing = ids.difference(merged.index)
+                if len(missing):
+                    cur.execute("SELECT * FROM hr.employee WHERE emp_id = ANY(%s)", (missing.tolist(),))
+                    merged = self._merge(merged, self._frame(cur.fetchall(), [d.name for d in cur.description]))
+            conn.rollback()
+
+        if merged is not df:
+            self.df = merged
+            self.version += 1
+        self.refreshed_at = time.monotonic()
+        self.stats["refreshes"] += 1
+
+
+class EmployeeListener(threading.Thread):
+    """Background LISTEN on the employee change channel that patches a snapshot.
+
+    Uses its own autocommit connection rather than one from the pool, since it
+    is held open for as long as the server runs. If the connection drops, the
+    snapshot falls back to timed refreshes until the listener reconnects.
+    """
+
+    def __init__(self, snapshot, settings, channel=NOTIFY_CHANNEL):
+        super().__init__(name="employee-listener", daemon=True)
+        self.snapshot = snapshot
+        self.settings = settings
+        self.channel = channel
+        self.stats = {"notifications": 0, "reconnects": 0, "last_error": None}
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        failures = 0
+        while not self._stop_event.is_set():
+            conn = None
+            try:
+                conn = psycopg2.connect(**self.settings)
+                conn.set_isolation_level(extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                with conn.cursor() as cur:
+                    cur.execute(f"LISTEN {self.channel}")
+                self.snapshot.set_listening(True)
+                failures = 0
+                self._listen(conn)
+            except Exception as e:  # a failed patch must not end the thread either
+                failures += 1
+                self.stats["reconnects"] += 1
+                self.stats["last_error"] = str(e)
+            finally:
+                self.snapshot.listening = False
+                if conn is not None:
+                    conn.close()
+            self._stop_event.wait(RECONNECT_BACKOFF_S[min(failures, len(RECONNECT_BACKOFF_S) - 1)])
+
+    def _listen(self, conn):
+        while not self._stop_event.is_set():
+            if select.select([conn], [], [], LISTEN_TIMEOUT_S) == ([], [], []):
+                continue
+            time.sleep(NOTIFY_BATCH_S)
+            conn.poll()
+            changed, deleted, truncated = set(), set(), False
+            while conn.notifies:
+                payload = json.loads(conn.notifies.pop(0).payload)
+                self.stats["notifications"] += 1
+                if payload["op"] == "TRUNCATE":
+                    truncated = True
+                elif payload["op"] == "DELETE":
+                    changed.discard(payload["emp_id"])
+                    deleted.add(payload["emp_id"])
+                else:
+                    deleted.discard(payload["emp_id"])
+                    changed.add(payload["emp_id"])
+            if truncated:
+                self.snapshot.reload()
+            elif changed or deleted:
+                self.snapshot.patch(changed, deleted)
+
+
+# --- Write-behind settings ---
+DEBOUNCE_S = 2.0  # quiet time after the last edit before pending edits are written
+
+
+class EditQueue:
+    """One session's unsaved edits, merged per emp_id and written in batches.
+
+    Successive edits to the same employee collapse into one pending row,
+    based on the changed_time the row had when it was first edited. A flush
+    hands everything to a single batched write; rows whose changed_time
+    moved on in the meantime were changed by someone else, and are kept
+    aside as conflicts instead of being overwritten.
+    """
+
+    def __init__(self, debounce=DEBOUNCE_S):
+        self.debounce = debounce
+        self.pending = {}  # emp_id -> {column: value}
+        self.expected = {}  # emp_id -> changed_time the pending edits are based on
+        self.conflicts = {}  # emp_id -> (edits, changed_time they were based on)
+        self.last_edit = 0.0
+        self.failed = False  # last flush raised; no automatic retry until the next edit or commit
+        self.stats = {"edits": 0, "flushes": 0, "rows_written": 0, "conflicts": 0}
+
+    def add(self, emp_id, values, base_time):
+        if emp_id not in self.pending:
+            self.expected[emp_id] = base_time
+        self.pending.setdefault(emp_id, {}).update(values)
+        self.last_edit = time.monotonic()
+        self.failed = False
+        self.stats["edits"] += 1
+
+    def due(self):
+        """True once edits are pending, typing paused for the debounce interval and the last flush succeeded"""
+        return bool(self.pending) and not self.failed and time.monotonic() - self.last_edit >= self.debounce
+
+    def flush(self, write):
+        """Write pending edits with write(changes, expected) -> updated emp_ids.
+
+        Returns the number of rows written and the emp_ids that conflicted.
+        On error the edits stay pending and due() stays False until they
+        change again, so a write that keeps failing isn't retried every tick.
+        """
+        if not self.pending:
+            return 0, []
+        changes, expected = self.pending, self.expected
+        try:
+            updated = set(write(changes, expected))
+        except Exception:
+            self.failed = True
+            raise
+        self.failed = False
+        self.pending, self.expected = {}, {}
+
+        conflicted = sorted(set(changes) - updated)
+        for emp_id in conflicted:
+            self.conflicts[emp_id] = (changes[emp_id], expected[emp_id])
+        self.stats["flushes"] += 1
+        self.stats["rows_written"] += len(updated)
+        self.stats["conflicts"] += len(conflicted)
+        return len(updated), conflicted
+
+    def resolve(self, emp_id, keep, current_time=None):
+        """Drop a conflicting edit, or queue it again on top of the row's current version"""
+        edits, _ = self.conflicts.pop(emp_id)
+        if keep:
+            self.add(emp_id, edits, current_time)
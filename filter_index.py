@@ -0,0 +1,133 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from data_profile import is_numeric
+
+# Number of set bits for every byte value, used to count matches in packed bitmaps
+POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def count_bits(bitmap):
+    return int(POPCOUNT[bitmap].sum(dtype=np.int64))
+
+
+class NumericIndex:
+    """Row positions sorted by value, for range queries by binary search"""
+
+    def __init__(self, series):
+        values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+        order = np.argsort(values, kind="stable")  # NaN sorts last
+        self.sorted_values = values[order]
+        self.order = order
+        self.valid = int(np.count_nonzero(~np.isnan(values)))
+
+    def positions(self, low, high):
+        valid_values = self.sorted_values[:self.valid]
+        start = np.searchsorted(valid_values, low, side="left")
+        stop = np.searchsorted(valid_values, high, side="right")
+        return self.order[start:stop]
+
+
+class CategoryIndex:
+    """Category codes with lazily built per-category bitmaps, for isin queries"""
+
+    def __init__(self, series):
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            codes, uniques = series.cat.codes.to_numpy(), series.cat.categories
+        else:
+            codes, uniques = pd.factorize(series)
+        self.values = list(uniques)
+        self.code_of = {value: code for code, value in enumerate(self.values)}
+        # Rows grouped by code, so one category's rows are a contiguous slice
+        self.order = np.argsort(codes, kind="stable")
+        counts = np.bincount(codes[codes >= 0], minlength=len(self.values))
+        missing = int(np.count_nonzero(codes < 0))
+        self.starts = missing + np.concatenate([[0], np.cumsum(counts)[:-1]])
+        self.counts = counts
+        self.bitmaps = {}
+
+    def bitmap(self, code, n_rows):
+        if code not in self.bitmaps:
+            start = self.starts[code]
+            self.bitmaps[code] = to_bitmap(self.order[start:start + self.counts[code]], n_rows)
+        return self.bitmaps[code]
+
+
+def to_bitmap(positions, n_rows):
+    mask = np.zeros(n_rows, dtype=bool)
+    mask[positions] = True
+    return np.packbits(mask)
+
+
+class FilterIndex:
+    """Per-column indexes for one dataset, built on first use of each column.
+
+    Numeric filters are answered with a binary search over sorted values and
+    category filters by OR-ing cached per-category bitmaps; combining filters
+    is a bitwise AND of packed bitmaps, so no filter change rescans the frame.
+    """
+
+    def __init__(self, df):
+        self.df = df
+        self.n_rows = len(df)
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def index(self, col):
+        with self._lock:
+            if col not in self._indexes:
+                series = self.df[col]
+                self._indexes[col] = NumericIndex(series) if is_numeric(series) else CategoryIndex(series)
+            return self._indexes[col]
+
+    def options(self, col):
+        """Distinct values of a categorical column, in order of first appearance"""
+        return self.index(col).values
+
+    def range_bitmap(self, col, low, high):
+        return to_bitmap(self.index(col).positions(low, high), self.n_rows)
+
+    def isin_bitmap(self, col, values):
+        index = self.index(col)
+        codes = [index.code_of[value] for value in values if value in index.code_of]
+        if not codes:
+            return np.zeros((self.n_rows + 7) // 8, dtype=np.uint8)
+        return np.bitwise_or.reduce([index.bitmap(code, self.n_rows) for code in codes])
+
+    def apply(self, filters):
+        """Combine filters given as {col: (low, high)} or {col: [values]}.
+
+        Returns the combined bitmap (None when no filter is active) and the
+        match count of each individual filter.
+        """
+        bitmaps, counts = [], {}
+        for col, condition in filters.items():
+            if isinstance(condition, tuple):
+                bitmap = self.range_bitmap(col, *condition)
+            else:
+                bitmap = self.isin_bitmap(col, condition)
+            bitmaps.append(bitmap)
+            counts[col] = count_bits(bitmap)
+        if not bitmaps:
+            return None, counts
+        return np.bitwise_and.reduce(bitmaps), counts
+
+    def matches(self, bitmap):
+        return self.n_rows if bitmap is None else count_bits(bitmap)
+
+    def positions(self, bitmap):
+        """Row positions selected by a bitmap (None selects every row)"""
+        if bitmap is None:
+            return np.arange(self.n_rows)
+        return np.flatnonzero(np.unpackbits(bitmap, count=self.n_rows))
+
+    def rows(self, bitmap, limit=None):
+        """Frame rows selected by a bitmap, optionally only the first limit rows"""
+        if bitmap is None:
+            return self.df if limit is None else self.df.head(limit)
+        positions = self.positions(bitmap)
+        if limit is not None:
+            positions = positions[:limit]
+        return self.df.iloc[positions]
@@ -0,0 +1,183 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from io import BytesIO
+
+import pdfplumber
+
+# --- Page raster cache settings ---
+CACHE_DIR = os.environ.get("PAGE_CACHE_DIR", ".page_cache")
+CACHE_BUDGET_MB = int(os.environ.get("PAGE_CACHE_MB", "256"))
+PREFETCH_WORKERS = 2
+PREFETCH_RADIUS = 2  # pages on each side of the current one rendered ahead of time
+
+# pdfium, which pdfplumber rasterizes with, must not be used from two threads at once
+RENDER_LOCK = threading.Lock()
+
+
+def file_hash(path):
+    """Content hash of a file, read in blocks"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def render_page(pdf_path, page_number, dpi):
+    """PNG bytes of one page (1-based)"""
+    with RENDER_LOCK, pdfplumber.open(pdf_path) as pdf:
+        image = pdf.pages[page_number - 1].to_image(resolution=dpi)
+        buffer = BytesIO()
+        image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class PageRasterCache:
+    """Encoded page images on disk, keyed on (PDF hash, page, DPI), evicted LRU by total bytes.
+
+    The index is rebuilt from the directory on start (oldest file first), so
+    renders survive server restarts.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, budget_mb=CACHE_BUDGET_MB):
+        self.cache_dir = cache_dir
+        self.budget = budget_mb * 1024 * 1024
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        files = [(entry.stat().st_mtime, entry.name, entry.stat().st_size)
+                 for entry in os.scandir(cache_dir) if entry.name.endswith(".png")]
+        self._sizes = OrderedDict((name, size) for _, name, size in sorted(files))
+        self._nbytes = sum(self._sizes.values())
+
+    @staticmethod
+    def _name(pdf_hash, page_number, dpi):
+        return f"{pdf_hash}_{page_number}_{dpi}.png"
+
+    def __contains__(self, key):
+        with self._lock:
+            return self._name(*key) in self._sizes
+
+    def get(self, key):
+        name = self._name(*key)
+        with self._lock:
+            if name not in self._sizes:
+                return None
+            self._sizes.move_to_end(name)
+        try:
+            with open(os.path.join(self.cache_dir, name), "rb") as f:
+                return f.read()
+        except OSError:
+            with self._lock:
+                self._nbytes -= self._sizes.pop(name, 0)
+            return None
+
+    def put(self, key, data):
+        name = self._name(*key)
+        path = os.path.join(self.cache_dir, name)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._nbytes += len(data) - self._sizes.pop(name, 0)
+            self._sizes[name] = len(data)
+            while len(self._sizes) > 1 and self._nbytes > self.budget:
+                evicted, size = self._sizes.popitem(last=False)
+                self._nbytes -= size
+                try:
+                    os.remove(os.path.join(self.cache_dir, evicted))
+                except OSError:
+                    pass
+
+    def metrics(self):
+        with self._lock:
+            return {"pages": len(self._sizes), "disk_mb": round(self._nbytes / 1024 ** 2, 1)}
+
+
+class PageRenderer:
+    """Serves page images from the cache and renders neighbouring pages in the background.
+
+    A page that is already being rendered (for example by a prefetch) is
+    waited on rather than rendered twice.
+    """
+
+    def __init__(self, cache=None, workers=PREFETCH_WORKERS):
+        self.cache = cache or PageRasterCache()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="page-prefetch")
+        self._in_flight = {}  # key -> Future
+        self._hashes = {}  # (path, size, mtime) -> content hash
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "renders": 0, "prefetched": 0}
+
+    def pdf_hash(self, pdf_path):
+        stat = os.stat(pdf_path)
+        file_key = (os.path.abspath(pdf_path), stat.st_size, stat.st_mtime_ns)
+        if file_key not in self._hashes:
+            self._hashes[file_key] = file_hash(pdf_path)
+        return self._hashes[file_key]
+
+    def _render(self, pdf_path, key):
+        # Only the renderer registered in _in_flight for key gets here, so it owns the entry
+        try:
+            data = render_page(pdf_path, key[1], key[2])
+            self.cache.put(key, data)
+            return data
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def _submit(self, pdf_path, key):
+        # Called with the lock held
+        future = self._in_flight.get(key)
+        if future is None:
+            future = self._executor.submit(self._render, pdf_path, key)
+            self._in_flight[key] = future
+        return future
+
+    def page_image(self, pdf_path, page_number, dpi):
+        """PNG bytes of a page, from the cache when possible"""
+        key = (self.pdf_hash(pdf_path), page_number, dpi)
+        data = self.cache.get(key)
+        if data is not None:
+            self.stats["hits"] += 1
+            return data
+        with self._lock:
+            future = self._in_flight.get(key)
+            # A prefetch may have finished since the lookup above
+            owner = future is None and key not in self.cache
+            if owner:
+                future = self._in_flight[key] = Future()
+        if future is None:
+            return self.cache.get(key) or self.page_image(pdf_path, page_number, dpi)
+        if not owner:
+            return future.result()
+
+        # Rendered on the script thread, but registered so prefetches and other sessions wait for it
+        self.stats["renders"] += 1
+        try:
+            data = self._render(pdf_path, key)
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        future.set_result(data)
+        return data
+
+    def prefetch(self, pdf_path, page_number, dpi, num_pages, radius=PREFETCH_RADIUS):
+        """Queue renders of the pages around page_number that aren't cached yet"""
+        pdf_hash = self.pdf_hash(pdf_path)
+        # Nearest pages first, the next page before the previous one
+        neighbours = [page_number + step * sign for step in range(1, radius + 1) for sign in (1, -1)]
+        with self._lock:
+            for neighbour in neighbours:
+                key = (pdf_hash, neighbour, dpi)
+                if 1 <= neighbour <= num_pages and key not in self._in_flight and key not in self.cache:
+                    self._submit(pdf_path, key)
+                    self.stats["prefetched"] += 1
+
+    def metrics(self):
+        with self._lock:
+            in_flight = len(self._in_flight)
+        return dict(self.stats, in_flight=in_flight, **self.cache.metrics())
@@ -0,0 +1,140 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from data_profile import is_numeric
+
+PAGE_SIZES = [25, 50, 100, 250, 1000]
+SEARCH_CACHE_ENTRIES = 8
+
+
+class TableView:
+    """Server-side sorting, searching and paging over one frame.
+
+    Each column's sort order is computed once and each search term is matched
+    once; a query only filters those cached orders, and the browser is sent a
+    single page of rows, never the whole frame.
+    """
+
+    def __init__(self, df):
+        self.df = df
+        self.n_rows = len(df)
+        self._orders = {}  # col -> (row positions in ascending order, number of non-null values)
+        self._searches = OrderedDict()  # term -> boolean row mask
+        self._lock = threading.Lock()
+
+    def _sort_order(self, col):
+        with self._lock:
+            if col not in self._orders:
+                series = self.df[col].reset_index(drop=True)
+                try:
+                    ordered = series.sort_values(kind="stable", na_position="last")
+                except TypeError:  # mixed types: fall back to comparing as text
+                    ordered = series.astype("string").sort_values(kind="stable", na_position="last")
+                self._orders[col] = (ordered.index.to_numpy(), int(series.notna().sum()))
+            return self._orders[col]
+
+    def sort_order(self, col, ascending=True):
+        """Row positions ordered by col; missing values stay last either way"""
+        order, valid = self._sort_order(col)
+        if ascending:
+            return order
+        return np.concatenate([order[:valid][::-1], order[valid:]])
+
+    def search_mask(self, term):
+        """Rows where any column contains term, case-insensitively"""
+        term = term.strip().lower()
+        with self._lock:
+            if term in self._searches:
+                self._searches.move_to_end(term)
+                return self._searches[term]
+
+        has_digit = any(ch.isdigit() for ch in term)
+        mask = np.zeros(self.n_rows, dtype=bool)
+        for col in self.df.columns:
+            series = self.df[col]
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                # Match the categories once, then look rows up by code
+                hits = series.cat.categories.astype(str).str.lower().str.contains(term, regex=False)
+                codes = series.cat.codes.to_numpy()
+                # Missing values have code -1, which picks the trailing False
+                mask |= np.append(np.asarray(hits, dtype=bool), False)[codes]
+                continue
+            if (is_numeric(series) or pd.api.types.is_datetime64_any_dtype(series)) and not has_digit:
+                continue
+            mask |= series.astype("string").str.contains(term, case=False, regex=False, na=False).to_numpy()
+
+        with self._lock:
+            self._searches[term] = mask
+            while len(self._searches) > SEARCH_CACHE_ENTRIES:
+                self._searches.popitem(last=False)
+        return mask
+
+    def query(self, positions=None, search="", sort_col=None, ascending=True):
+        """Row positions matching search within positions (all rows if None), in sort order"""
+        mask = None
+        if positions is not None:
+            mask = np.zeros(self.n_rows, dtype=bool)
+            mask[positions] = True
+        if search.strip():
+            found = self.search_mask(search)
+            mask = found if mask is None else mask & found
+        if sort_col is not None:
+            order = self.sort_order(sort_col, ascending)
+            return order if mask is None else order[mask[order]]
+        return np.arange(self.n_rows) if mask is None else np.flatnonzero(mask)
+
+
+def page_controls(view, key, positions=None):
+    """Search, sort and paging widgets; returns the row positions of the visible page.
+
+    Widget keys start with key, so callers can scope them to a section.
+    """
+    search_col, sort_col_widget, order_col, size_col = st.columns([3, 2, 1, 1])
+    search = search_col.text_input("Search", key=f"{key}_search", placeholder="Search all columns")
+    sort_col = sort_col_widget.selectbox("Sort by", [None, *view.df.columns], key=f"{key}_sort",
+                                         format_func=lambda c: "(original order)" if c is None else str(c))
+    descending = order_col.checkbox("Descending", key=f"{key}_desc", disabled=sort_col is None)
+    page_size = size_col.selectbox("Rows per page", PAGE_SIZES, index=1, key=f"{key}_page_size")
+
+    matched = view.query(positions, search, sort_col, not descending)
+    n_pages = max(1, -(-len(matched) // page_size))
+    # Results can shrink under the current page; clamp before the widget reads it
+    page_key = f"{key}_page"
+    if st.session_state.get(page_key, 1) > n_pages:
+        st.session_state[page_key] = n_pages
+    page = st.number_input(f"Page (of {n_pages:,})", min_value=1, max_value=n_pages, step=1, key=page_key)
+
+    start = (page - 1) * page_size
+    page_positions = matched[start:start + page_size]
+    st.caption(f"Rows {start + 1 if len(page_positions) else 0:,}–{start + len(page_positions):,} "
+               f"of {len(matched):,}")
+    return page_positions
+
+
+def paged_table(view, key, positions=None):
+    """Read-only grid that sends one page of the view to the browser"""
+    page_positions = page_controls(view, key, positions)
+    st.dataframe(view.df.iloc[page_positions], use_container_width=True)
+
+
+def apply_editor_changes(df, page_index, changes):
+    """Apply a data_editor delta made on one page back onto the full frame.
+
+    page_index holds the frame's index labels of the edited page, in page order;
+    changes is the editor's session state (edited_rows, added_rows, deleted_rows).
+    Cell edits are written into df in place; returns the frame with a fresh RangeIndex.
+    """
+    for row, values in changes.get("edited_rows", {}).items():
+        for col, value in values.items():
+            df.loc[page_index[int(row)], col] = value
+    deleted = [page_index[int(row)] for row in changes.get("deleted_rows", [])]
+    if deleted:
+        df = df.drop(index=deleted)
+    added = changes.get("added_rows", [])
+    if added:
+        df = pd.concat([df, pd.DataFrame(added, columns=df.columns)])
+    return df.reset_index(drop=True)
@@ -1,14 +1,22 @@
 import streamlit as st
 import pdfplumber
 import json
-from PIL import Image
-from io import BytesIO
 import os
 
+from page_cache import PageRenderer
+
 # --- Constants ---
 PDF_FILE = "DistributionForm.pdf"
 TEXT_JSON_FILE = "extracted_text.json"
 STATUS_JSON_FILE = "page_status.json"
+RENDER_DPI = 150
+
+
+@st.cache_resource
+def get_page_renderer():
+    """Rendered pages shared by all users, cached on disk and prefetched around the current page"""
+    return PageRenderer()
+
 
 # --- Load Extracted Text ---
 if os.path.exists(TEXT_JSON_FILE):
@@ -56,11 +64,10 @@ with pdfplumber.open(PDF_FILE) as pdf:
         img_col, text_col = st.columns(2)
 
         with img_col:
-            page = pdf.pages[selected_page - 1]
-            img = page.to_image(resolution=150)
-            image_bytes = BytesIO()
-            img.save(image_bytes, format="PNG")
-            st.image(Image.open(BytesIO(image_bytes.getvalue())), caption=f"Page {selected_page}")
+            # Encoded PNG bytes go straight to the frontend; neighbours render while this page is reviewed
+            renderer = get_page_renderer()
+            st.image(renderer.page_image(PDF_FILE, selected_page, RENDER_DPI), caption=f"Page {selected_page}")
+            renderer.prefetch(PDF_FILE, selected_page, RENDER_DPI, num_pages)
 
             # Status with refreshable placeholder
             status_placeholder = st.empty()
@@ -89,3 +96,6 @@ with pdfplumber.open(PDF_FILE) as pdf:
                 with open(TEXT_JSON_FILE, "w") as f:
                     json.dump(page_text_list, f, indent=2)
                 st.success(f"Saved updated text for page {selected_page}")
+
+with st.sidebar.expander("Page cache"):
+    st.write(get_page_renderer().metrics())
@@ -0,0 +1,176 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import extensions
+
+# --- Pool settings ---
+POOL_MIN_SIZE = int(os.environ.get("PG_POOL_MIN", "1"))
+POOL_MAX_SIZE = int(os.environ.get("PG_POOL_MAX", "10"))
+ACQUIRE_TIMEOUT_S = float(os.environ.get("PG_POOL_ACQUIRE_TIMEOUT", "10"))
+HEALTH_CHECK_IDLE_S = 30  # idle connections older than this are pinged before reuse
+
+# Errors after which a connection can't be trusted and is replaced
+CONNECTION_ERRORS = (psycopg2.OperationalError, psycopg2.InterfaceError)
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    """Thread-safe pool of psycopg2 connections shared by every session.
+
+    Each request borrows its own connection (and cursor), so sessions never
+    share a transaction. Idle connections are health-checked before reuse
+    and broken ones are replaced, so one dropped connection only fails the
+    request that was using it.
+    """
+
+    def __init__(self, min_size=POOL_MIN_SIZE, max_size=POOL_MAX_SIZE,
+                 acquire_timeout=ACQUIRE_TIMEOUT_S, **settings):
+        self.settings = settings
+        self.min_size = min_size
+        self.max_size = max(max_size, 1)
+        self.acquire_timeout = acquire_timeout
+        self._idle = []  # (connection, time returned to the pool)
+        self._size = 0  # open connections, idle or in use
+        self._cond = threading.Condition()
+        self._metrics = {"created": 0, "closed": 0, "acquired": 0, "waits": 0,
+                         "wait_s_total": 0.0, "wait_s_max": 0.0, "health_check_failures": 0}
+        for _ in range(min_size):
+            self._idle.append((self._connect(), time.monotonic()))
+            self._size += 1
+
+    def _connect(self):
+        conn = psycopg2.connect(**self.settings)
+        with self._cond:
+            self._metrics["created"] += 1
+        return conn
+
+    def _close(self, conn):
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+        with self._cond:
+            self._metrics["closed"] += 1
+
+    def _healthy(self, conn, idle_since):
+        if conn.closed:
+            return False
+        if time.monotonic() - idle_since < HEALTH_CHECK_IDLE_S:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except CONNECTION_ERRORS:
+            return False
+
+    def acquire(self):
+        """Borrow a connection, waiting up to acquire_timeout if the pool is exhausted"""
+        start = time.monotonic()
+        waited = False
+        while True:
+            with self._cond:
+                while not self._idle and self._size >= self.max_size:
+                    waited = True
+                    remaining = self.acquire_timeout - (time.monotonic() - start)
+                    if remaining <= 0 or not self._cond.wait(remaining):
+                        if not self._idle and self._size >= self.max_size:
+                            raise PoolTimeout(f"No database connection free after {self.acquire_timeout}s "
+                                              f"({self.max_size} in use)")
+                if self._idle:
+                    conn, idle_since = self._idle.pop()
+                else:
+                    conn, idle_since = None, None
+                    self._size += 1  # reserve a slot before connecting outside the lock
+                self._record_wait(time.monotonic() - start, waited)
+
+            if conn is None:
+                try:
+                    return self._connect()
+                except Exception:
+                    self._discard_slot()
+                    raise
+            if self._healthy(conn, idle_since):
+                return conn
+            # Stale connection: drop it and try again with a fresh one
+            with self._cond:
+                self._metrics["health_check_failures"] += 1
+            self._close(conn)
+            self._discard_slot()
+
+    def _record_wait(self, seconds, waited):
+        # Called with the lock held
+        self._metrics["acquired"] += 1
+        if waited:
+            self._metrics["waits"] += 1
+            self._metrics["wait_s_total"] += seconds
+            self._metrics["wait_s_max"] = max(self._metrics["wait_s_max"], seconds)
+
+    def _discard_slot(self):
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    def release(self, conn, broken=False):
+        """Return a connection; broken or closed connections are closed instead of reused"""
+        if not broken and not conn.closed:
+            try:
+                if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except CONNECTION_ERRORS:
+                broken = True
+        if broken or conn.closed:
+            self._close(conn)
+            self._discard_slot()
+            return
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        broken = False
+        try:
+            yield conn
+        except CONNECTION_ERRORS:
+            broken = True
+            raise
+        finally:
+            self.release(conn, broken=broken)
+
+    @contextmanager
+    def transaction(self):
+        """A cursor on a borrowed connection; commits on success, rolls back on error"""
+        with self.connection() as conn:
+            try:
+                with conn.cursor() as cur:
+                    yield cur
+                conn.commit()
+            except Exception:
+                try:
+                    conn.rollback()
+                except CONNECTION_ERRORS:
+                    pass  # connection() sees the original error and discards the connection
+                raise
+
+    def metrics(self):
+        with self._cond:
+            metrics = dict(self._metrics)
+            metrics.update(size=self._size, idle=len(self._idle), in_use=self._size - len(self._idle),
+                           max_size=self.max_size)
+        return metrics
+
+    def close(self):
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+        for conn, _ in idle:
+            self._close(conn)
@@ -1,9 +1,12 @@
 import streamlit as st
 import pandas as pd
-import psycopg2
+from psycopg2.extras import execute_values
 from datetime import datetime
 import json
 
+from pg_pool import ConnectionPool
+from employee_cache import EditQueue, EmployeeListener, EmployeeSnapshot
+
 # --- DB Connection ---
 DB_SETTINGS = {
     "host": "localhost",
@@ -15,26 +18,132 @@ DB_SETTINGS = {
 
 
 @st.cache_resource
-def get_connection():
-    return psycopg2.connect(**DB_SETTINGS)
+def get_pool():
+    """Connection pool shared by all sessions; each request borrows its own connection"""
+    return ConnectionPool(**DB_SETTINGS)
+
+
+pool = get_pool()
+
+# Editable columns and the SQL types their new values are cast to
+EDITABLE_COLUMNS = {
+    "salary": "numeric",
+    "designation": "varchar",
+    "changed_by": "varchar",
+    "reason": "varchar",
+}
 
 
-conn = get_connection()
-cursor = conn.cursor()
+def to_python(value):
+    """Convert NumPy scalars and pandas missing values to types psycopg2 can adapt"""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    return value.item() if hasattr(value, "item") else value
+
+
+def update_employees(cursor, changes, changed_time, expected):
+    """Write {emp_id: {column: value}} in one transaction, touching only the changed columns.
+
+    Rows are grouped by which columns changed; each group is a single
+    UPDATE ... FROM (VALUES ...) statement, however many rows it has.
+    A row is only updated while its changed_time still equals expected[emp_id],
+    so edits never overwrite a newer write. Returns the emp_ids updated.
+    """
+    groups = {}
+    for emp_id, values in changes.items():
+        columns = tuple(col for col in EDITABLE_COLUMNS if col in values)
+        if columns:
+            groups.setdefault(columns, []).append(
+                (emp_id, *(to_python(values[col]) for col in columns), changed_time,
+                 to_python(expected[emp_id])))
+
+    updated = []
+    for columns, rows in groups.items():
+        assignments = ", ".join(f"{col} = v.{col}" for col in columns)
+        template = "(%s::int, " + "".join(f"%s::{EDITABLE_COLUMNS[col]}, " for col in columns) + \
+            "%s::timestamp, %s::timestamp)"
+        returned = execute_values(cursor, f"""
+            UPDATE hr.employee AS e
+            SET {assignments}, changed_time = v.changed_time
+            FROM (VALUES %s) AS v(emp_id, {", ".join(columns)}, changed_time, expected_time)
+            WHERE e.emp_id = v.emp_id
+              AND e.changed_time IS NOT DISTINCT FROM v.expected_time
+            RETURNING e.emp_id
+        """, rows, template=template, page_size=len(rows), fetch=True)
+        updated.extend(emp_id for emp_id, in returned)
+    return updated
+
+
+def write_changes(changes, expected):
+    with pool.transaction() as cursor:
+        return update_employees(cursor, changes, datetime.now(), expected)
 
 
 # --- Load employee table from DB ---
-@st.cache_data(ttl=5)  # Cache for 5 seconds
-def load_employee_table():
-    df = pd.read_sql("SELECT * FROM hr.employee ORDER BY emp_id", conn)
-    df["changed_by"] = df["changed_by"].fillna("")
-    df["reason"] = df["reason"].fillna("")
-    return df
+@st.cache_resource
+def get_employee_snapshot():
+    """Employee table shared by all sessions, patched from change notifications"""
+    snapshot = EmployeeSnapshot(pool)
+    snapshot.listener = EmployeeListener(snapshot, DB_SETTINGS)
+    snapshot.listener.start()
+    return snapshot
+
+
+def load_employee_table(max_age=5):
+    return get_employee_snapshot().get(max_age=max_age)
 
 
 # --- Initialize session state ---
-if "edited_rows" not in st.session_state:
-    st.session_state.edited_rows = {}
+if "edit_queue" not in st.session_state:
+    st.session_state.edit_queue = EditQueue()
+    # Bumped to restart the editor once its accumulated edited_rows must not be queued again
+    st.session_state.editor_generation = 0
+queue = st.session_state.edit_queue
+
+
+def flush_edits():
+    """Write the queued edits in one batch and report the outcome on the next run"""
+    try:
+        written, conflicted = queue.flush(write_changes)
+    except Exception as e:
+        st.session_state.flush_message = ("error", f"Commit failed, edits are still queued: {e}")
+        return
+    if conflicted:
+        # The editor still holds the conflicting edits and would queue them again on its next
+        # change, undoing "Discard mine"; everything else it holds was just written
+        st.session_state.editor_generation += 1
+    if written or conflicted:
+        st.session_state.flush_message = ("success", f"{written} record(s) updated.")
+        # Pull our own changes into the snapshot right away
+        load_employee_table(max_age=0)
+
+
+@st.fragment(run_every=1)
+def background_sync(seen_version):
+    """Flush edits once typing pauses, and rerun when the shared snapshot changes.
+
+    Only reads memory unless there is something to write.
+    """
+    if queue.due():
+        flush_edits()
+        st.rerun()
+    if get_employee_snapshot().version != seen_version:
+        st.rerun()
+
+
+def queue_editor_changes(editor_key, view):
+    """on_change: move the editor's cell edits into the write-behind queue"""
+    for row_idx, edited_values in st.session_state[editor_key].get("edited_rows", {}).items():
+        row = view.iloc[int(row_idx)]
+        emp_id = int(row["emp_id"])  # Convert numpy.int64 to Python int
+        # Only include columns whose value actually changed
+        changed = {col: value for col, value in edited_values.items()
+                   if col in EDITABLE_COLUMNS and to_python(value) != to_python(row[col])}
+        if changed:
+            queue.add(emp_id, changed, row["changed_time"])
+
 
 # --- UI ---
 st.title("🧑‍💼 Employee Table Editor with Audit Fields")
@@ -42,93 +151,76 @@ st.caption("Editable: salary, designation, changed_by, reason")
 
 # --- Load fresh data
 data = load_employee_table()
+version = get_employee_snapshot().version
+background_sync(version)
+
+flush_message = st.session_state.pop("flush_message", None)
+if flush_message:
+    getattr(st, flush_message[0])(flush_message[1])
+
+# Show queued edits on top of the shared snapshot (which is never modified in place)
+view = data
+if queue.pending:
+    view = data.copy()
+    for emp_id, values in queue.pending.items():
+        if emp_id in view.index:
+            for col, value in values.items():
+                view.at[emp_id, col] = value
 
 # --- Show editable table ---
+# A new snapshot version may add or remove rows, so the editor restarts on it;
+# its edits are already in the queue by then. It also restarts after a conflict.
+editor_key = f"employee_editor_{version}_{st.session_state.editor_generation}"
 reason_options = ["Promotion", "Correction", "Annual Review", "Other"]
-editor = st.data_editor(
-    data,
-    disabled=[col for col in data.columns if col not in ["salary", "designation", "changed_by", "reason"]],
+st.data_editor(
+    view,
+    disabled=[col for col in view.columns if col not in EDITABLE_COLUMNS],
     column_config={
         "reason": st.column_config.SelectboxColumn("Reason", options=reason_options),
     },
     use_container_width=True,
+    hide_index=True,
     num_rows="fixed",
-    key="employee_editor",
-    # on_change=lambda: st.session_state.update({"edited_rows": st.session_state.employee_editor.get("edited_rows", {})})
+    key=editor_key,
+    on_change=queue_editor_changes,
+    args=(editor_key, view),
 )
 
-# --- Get edited rows ---
-edited_rows = st.session_state.employee_editor.get("edited_rows", {})
-
 # --- Commit button ---
-
-def commit_changes():
-    if edited_rows:
-        changes = []
-
-        # Process each edited row
-        for row_idx, edited_values in edited_rows.items():
-            # Get the emp_id from the data using the row index
-            row_idx = int(row_idx)  # Convert string index to integer
-            if row_idx < len(data):
-                emp_id = int(data.iloc[row_idx]["emp_id"])  # Convert numpy.int64 to Python int
-
-                # Only include columns that were actually edited
-                salary = edited_values.get("salary", data.iloc[row_idx]["salary"])
-                designation = edited_values.get("designation", data.iloc[row_idx]["designation"])
-                changed_by = edited_values.get("changed_by", data.iloc[row_idx]["changed_by"])
-                reason = edited_values.get("reason", data.iloc[row_idx]["reason"])
-
-                # Convert NumPy types to Python native types
-                if hasattr(salary, "item"):
-                    salary = salary.item()
-                if hasattr(designation, "item"):
-                    designation = designation.item()
-                if hasattr(changed_by, "item"):
-                    changed_by = changed_by.item()
-                if hasattr(reason, "item"):
-                    reason = reason.item()
-
-                changes.append((
-                    salary,
-                    designation,
-                    changed_by,
-                    reason,
-                    datetime.now(),
-                    emp_id
-                ))
-
-        # Apply changes to database
-        for salary, designation, changed_by, reason, changed_time, emp_id in changes:
-            cursor.execute("""
-                UPDATE hr.employee
-                SET salary = %s,
-                    designation = %s,
-                    changed_by = %s,
-                    reason = %s,
-                    changed_time = %s
-                WHERE emp_id = %s
-            """, (salary, designation, changed_by, reason, changed_time, emp_id))
-        conn.commit()
-
-        # Show success message
-        st.success(f"{len(changes)} record(s) updated.")
-
-        # Clear the edited_rows in session state
-        st.session_state.edited_rows = {}
-
-        # Force a refresh of the data (clear the cache)
-        load_employee_table.clear()
+if queue.pending and queue.failed:
+    st.caption(f"{len(queue.pending)} row(s) with unsaved edits; automatic saving is paused after "
+               "a failed write until you edit again or press Commit.")
+elif queue.pending:
+    st.caption(f"{len(queue.pending)} row(s) with unsaved edits; they are written "
+               f"{queue.debounce:g}s after you stop typing.")
+if st.button("💾 Commit Change"):
+    if queue.pending:
+        flush_edits()
         st.rerun()
     else:
         st.info("No changes detected.")
 
-
-if st.button("💾 Commit Change"):
-    commit_changes()
-if edited_rows:
-    commit_changes()
+# --- Conflicts: rows someone else changed after we started editing them ---
+for emp_id, (edits, _) in list(queue.conflicts.items()):
+    current = data.loc[emp_id] if emp_id in data.index else None
+    with st.container(border=True):
+        if current is None:
+            st.warning(f"Employee {emp_id} was deleted by someone else; your edits {edits} were not saved.")
+        else:
+            st.warning(f"Employee {emp_id} was changed by {current['changed_by'] or 'someone else'} "
+                       f"after you started editing; your edits {edits} were not saved.")
+        keep_col, discard_col = st.columns(2)
+        if current is not None and keep_col.button("Overwrite with mine", key=f"conflict_keep_{emp_id}"):
+            queue.resolve(emp_id, keep=True, current_time=current["changed_time"])
+            st.rerun()
+        if discard_col.button("Discard mine", key=f"conflict_discard_{emp_id}"):
+            queue.resolve(emp_id, keep=False)
+            st.rerun()
 
 # --- Debug info (optional) ---
 with st.expander("Debug Info"):
-    st.write("Edited Rows:", edited_rows)
\ No newline at end of file
+    st.write("Pending edits:", queue.pending)
+    st.write("Edit queue:", queue.stats)
+    st.write("Connection pool:", pool.metrics())
+    st.write("Snapshot:", get_employee_snapshot().stats)
+    st.write("Change listener:", get_employee_snapshot().listener.stats)
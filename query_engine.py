@@ -0,0 +1,128 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+try:
+    import duckdb
+except ImportError:  # optional: aggregations fall back to pandas
+    duckdb = None
+
+HAS_DUCKDB = duckdb is not None
+QUERY_THREADS = os.cpu_count() or 1
+WHISKER_IQR = 1.5
+SQL_AGGREGATES = {"mean": "AVG", "sum": "SUM"}
+
+
+def quote(name):
+    """Quote a column name as a SQL identifier"""
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+class QueryEngine:
+    """Group-by and box-plot summaries over one cached dataset.
+
+    With DuckDB installed the frame is registered as a view (scanned in place,
+    not copied) and queries run multi-threaded with top-k and quartiles
+    computed inside the engine; otherwise the same summaries are computed
+    with pandas. Either way callers only receive small summary frames.
+    """
+
+    def __init__(self, df, use_duckdb=HAS_DUCKDB):
+        self.df = df
+        self.use_duckdb = use_duckdb and HAS_DUCKDB
+        self._lock = threading.Lock()
+        if self.use_duckdb:
+            self._con = duckdb.connect(config={"threads": QUERY_THREADS})
+
+    @property
+    def name(self):
+        return "DuckDB" if self.use_duckdb else "pandas"
+
+    def _query(self, sql, params=None):
+        # A cursor per query lets concurrent sessions share the connection safely. Cursors
+        # don't see views registered on the parent, so each registers the frame (no copy)
+        with self._lock:
+            cursor = self._con.cursor()
+        try:
+            cursor.register("dataset", self.df)
+            return cursor.execute(sql, params or []).df()
+        finally:
+            cursor.close()
+
+    def group_aggregate(self, group_col, value_col, agg, limit=15):
+        """Top groups by mean or sum of value_col, plus the total number of groups"""
+        if self.use_duckdb:
+            g, v = quote(group_col), quote(value_col)
+            result = self._query(f"""
+                SELECT {g} AS grp, {SQL_AGGREGATES[agg]}({v}) AS value, COUNT(*) OVER () AS n_groups
+                FROM dataset
+                WHERE {g} IS NOT NULL
+                GROUP BY {g}
+                ORDER BY value DESC NULLS LAST
+                LIMIT {int(limit)}
+            """)
+            n_groups = int(result["n_groups"].iloc[0]) if not result.empty else 0
+            return pd.Series(result["value"].to_numpy(), index=result["grp"].rename(group_col)), n_groups
+
+        grouped = self.df.groupby(group_col, observed=True)[value_col].agg(agg)
+        return grouped.nlargest(limit), len(grouped)
+
+    def box_stats(self, value_col, group_col=None, top_k=10):
+        """Quartiles and 1.5 IQR whiskers, overall or for the top_k most frequent groups.
+
+        Returns a list of dicts in the format accepted by Axes.bxp.
+        """
+        if self.use_duckdb:
+            v = quote(value_col)
+            group_expr = quote(group_col) if group_col else "NULL"
+            top_filter = f"""
+                WHERE {group_expr} IN (
+                    SELECT {group_expr} FROM dataset WHERE {group_expr} IS NOT NULL
+                    GROUP BY ALL ORDER BY COUNT(*) DESC LIMIT {int(top_k)}
+                )""" if group_col else ""
+            result = self._query(f"""
+                WITH selected AS (
+                    SELECT {group_expr} AS grp, {v} AS x FROM dataset {top_filter}
+                ),
+                quartiles AS (
+                    SELECT grp, COUNT(x) AS n,
+                           quantile_cont(x, 0.25) AS q1, quantile_cont(x, 0.5) AS med,
+                           quantile_cont(x, 0.75) AS q3
+                    FROM selected WHERE x IS NOT NULL GROUP BY grp
+                )
+                SELECT q.grp, q.n, q.q1, q.med, q.q3,
+                       MIN(r.x) AS whislo, MAX(r.x) AS whishi
+                FROM quartiles q JOIN selected r ON r.grp IS NOT DISTINCT FROM q.grp
+                WHERE r.x BETWEEN q.q1 - {WHISKER_IQR} * (q.q3 - q.q1) AND q.q3 + {WHISKER_IQR} * (q.q3 - q.q1)
+                GROUP BY ALL
+                ORDER BY q.n DESC
+            """)
+        else:
+            result = self._pandas_box_stats(value_col, group_col, top_k)
+
+        return [{"label": "" if row.grp is None or pd.isna(row.grp) else str(row.grp),
+                 "q1": row.q1, "med": row.med, "q3": row.q3,
+                 "whislo": row.whislo, "whishi": row.whishi, "fliers": []}
+                for row in result.itertuples(index=False)]
+
+    def _pandas_box_stats(self, value_col, group_col, top_k):
+        if group_col:
+            top = self.df[group_col].value_counts().head(top_k).index
+            subset = self.df.loc[self.df[group_col].isin(top), [group_col, value_col]]
+            groups = subset.groupby(group_col, observed=True)[value_col]
+        else:
+            groups = self.df[value_col].groupby(np.zeros(len(self.df), dtype=np.int8))
+
+        rows = []
+        for grp, values in groups:
+            values = values.dropna()
+            if values.empty:
+                continue
+            q1, med, q3 = values.quantile([0.25, 0.5, 0.75])
+            inside = values[values.between(q1 - WHISKER_IQR * (q3 - q1), q3 + WHISKER_IQR * (q3 - q1))]
+            rows.append({"grp": grp if group_col else None, "n": len(values), "q1": q1, "med": med,
+                         "q3": q3, "whislo": inside.min(), "whishi": inside.max()})
+        return pd.DataFrame(rows, columns=["grp", "n", "q1", "med", "q3", "whislo", "whishi"]) \
+            .sort_values("n", ascending=False)
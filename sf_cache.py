@@ -0,0 +1,185 @@
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+# --- Result cache settings ---
+CACHE_TTL_S = float(os.environ.get("SNOWFLAKE_CACHE_TTL", "900"))
+MEMORY_BUDGET_MB = int(os.environ.get("SNOWFLAKE_CACHE_MEMORY_MB", "256"))
+SMALL_RESULT_MB = 16  # larger results are spilled to Parquet instead of held in memory
+CACHE_DIR = os.environ.get("SNOWFLAKE_CACHE_DIR", ".query_cache")
+SWEEP_INTERVAL_S = 60  # how often expired entries and stale spill files are removed
+
+# Literals, quoted identifiers, comments, whitespace, then any other run of characters
+SQL_TOKEN = re.compile(r"""'(?:[^']|'')*'|"(?:[^"]|"")*"|--[^\n]*|/\*.*?\*/|\s+|[^'"\s/-]+|.""", re.DOTALL)
+# Results of these change from run to run, so they are never cached
+NONDETERMINISTIC = re.compile(r"\b(current_(timestamp|time|date)|sysdate|getdate|localtimestamp|"
+                              r"random|uuid_string|seq[1248]|normal|uniform)\b")
+# Only plain reads are cached; every other statement runs every time
+READ_ONLY = re.compile(r"^(?:select|with|show)\b")
+DML_TARGET = re.compile(r"^(?:insert\s+(?:overwrite\s+)?into|update|delete\s+from|merge\s+into|"
+                        r"truncate\s+(?:table\s+)?|drop\s+table|alter\s+table)\s+([\w.\"$]+)")
+
+
+def normalize_sql(sql):
+    """Canonical form of a query: no comments, single spaces, lower case outside quotes"""
+    parts = []
+    for token in SQL_TOKEN.findall(sql):
+        if token.startswith(("--", "/*")) or token.isspace():
+            if parts and parts[-1] != " ":
+                parts.append(" ")
+        elif token.startswith(("'", '"')):
+            parts.append(token)
+        else:
+            parts.append(token.lower())
+    return "".join(parts).strip().rstrip(";").strip()
+
+
+def cache_key(sql, database, schema, warehouse):
+    """Key for a query's result; the same text can mean different tables in another context"""
+    context = "\x1f".join([normalize_sql(sql), database or "", schema or "", warehouse or ""])
+    return hashlib.blake2b(context.encode(), digest_size=16).hexdigest()
+
+
+def cacheable(sql):
+    """Whether a statement's result may be cached: a read whose result doesn't change between runs"""
+    sql = normalize_sql(sql)
+    return READ_ONLY.match(sql) is not None and NONDETERMINISTIC.search(sql) is None
+
+
+def dml_target(sql):
+    """Table a write statement changes (as written in the statement), or None"""
+    match = DML_TARGET.match(normalize_sql(sql))
+    return match.group(1).replace('"', "").split(".")[-1] if match else None
+
+
+class ResultCache:
+    """Query results keyed on normalized SQL and session context, with a TTL per entry.
+
+    Small results stay in an in-memory LRU bounded by total bytes; large ones
+    are written to Parquet and read back on a hit. Entries can be dropped one
+    at a time, all at once, or by a table a write statement touched. Expired
+    entries, and spill files older than the TTL that no entry refers to
+    (left by an earlier process), are swept on start and then every
+    SWEEP_INTERVAL_S as results are stored.
+    """
+
+    def __init__(self, ttl=CACHE_TTL_S, memory_budget_mb=MEMORY_BUDGET_MB,
+                 small_result_mb=SMALL_RESULT_MB, cache_dir=CACHE_DIR):
+        self.ttl = ttl
+        self.memory_budget = memory_budget_mb * 1024 * 1024
+        self.small_result = small_result_mb * 1024 * 1024
+        self.cache_dir = cache_dir
+        self._entries = OrderedDict()  # key -> entry dict
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "spills": 0, "invalidations": 0, "swept": 0}
+        os.makedirs(cache_dir, exist_ok=True)
+        self._last_sweep = 0.0
+        self.sweep()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.parquet")
+
+    def _drop(self, key):
+        # Called with the lock held
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        if entry["df"] is not None:
+            self._memory_bytes -= entry["nbytes"]
+        elif os.path.exists(self._path(key)):
+            os.remove(self._path(key))
+
+    def get(self, key):
+        """(DataFrame, fetch stats, age in seconds) for a live entry, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.time() >= entry["expires"]:
+                if entry is not None:
+                    self._drop(key)
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            df = entry["df"]
+        if df is None:
+            try:
+                df = pd.read_parquet(self._path(key))
+            except OSError:
+                return None  # invalidated while we were reading it
+        return df, entry["stats"], time.time() - entry["stored"]
+
+    def sweep(self):
+        """Drop expired entries and delete spill files no live entry refers to once older than the TTL"""
+        now = time.time()
+        with self._lock:
+            self._last_sweep = now
+            expired = [k for k, e in self._entries.items() if now >= e["expires"]]
+            for k in expired:
+                self._drop(k)
+            live = {f"{k}.parquet" for k in self._entries}
+        removed = len(expired)
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".parquet") and entry.name not in live:
+                try:
+                    if entry.stat().st_mtime < now - self.ttl:
+                        os.remove(entry.path)
+                        removed += 1
+                except OSError:
+                    pass  # removed meanwhile
+        with self._lock:
+            self.stats["swept"] += removed
+        return removed
+
+    def put(self, key, sql, df, stats=None, ttl=None):
+        if time.time() - self._last_sweep >= SWEEP_INTERVAL_S:
+            self.sweep()
+        nbytes = int(df.memory_usage(index=True, deep=True).sum())
+        spill = nbytes > self.small_result
+        with self._lock:
+            self._drop(key)
+        if spill:
+            try:
+                df.to_parquet(self._path(key), index=False)
+            except Exception:
+                return  # e.g. mixed-type object columns; just don't cache this result
+        now = time.time()
+        with self._lock:
+            self._entries[key] = {"sql": normalize_sql(sql), "df": None if spill else df, "nbytes": nbytes,
+                                  "stats": stats, "stored": now, "expires": now + (ttl or self.ttl)}
+            self.stats["stores"] += 1
+            if spill:
+                self.stats["spills"] += 1
+            else:
+                self._memory_bytes += nbytes
+                # Evict least recently used in-memory results beyond the budget
+                for old_key in [k for k, e in self._entries.items() if e["df"] is not None]:
+                    if self._memory_bytes <= self.memory_budget or old_key == key:
+                        break
+                    self._drop(old_key)
+
+    def invalidate(self, key=None, table=None):
+        """Drop one entry, every entry reading from table, or (with no arguments) everything"""
+        with self._lock:
+            if key is not None:
+                keys = [key] if key in self._entries else []
+            elif table is not None:
+                pattern = re.compile(rf"\b{re.escape(table)}\b", re.IGNORECASE)
+                keys = [k for k, e in self._entries.items() if pattern.search(e["sql"])]
+            else:
+                keys = list(self._entries)
+            for k in keys:
+                self._drop(k)
+            self.stats["invalidations"] += len(keys)
+        return len(keys)
+
+    def metrics(self):
+        with self._lock:
+            spilled = sum(1 for e in self._entries.values() if e["df"] is None)
+            return dict(self.stats, entries=len(self._entries), spilled=spilled,
+                        memory_mb=round(self._memory_bytes / 1024 ** 2, 1))
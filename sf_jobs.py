@@ -0,0 +1,109 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from sf_pool import POOL_MAX_SIZE
+
+# --- Concurrency settings ---
+# Queries running at once, all users: one per pooled session, so the rest wait as "queued"
+MAX_WORKERS = POOL_MAX_SIZE
+MAX_PER_SESSION = int(os.environ.get("SNOWFLAKE_MAX_PER_SESSION", "3"))  # queued or running, per user
+PREVIEW_ROWS = 1000  # rows shown while a query is still fetching
+
+
+class QueryCancelled(Exception):
+    pass
+
+
+class TooManyQueries(Exception):
+    pass
+
+
+class QueryJob:
+    """One submitted query: its status, progress and, once finished, its result"""
+
+    def __init__(self, sql):
+        self.id = uuid.uuid4().hex[:8]
+        self.sql = sql
+        self.status = "queued"  # queued, running, done, failed, cancelled
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.query_id = None  # Snowflake query ID, once the warehouse accepted it
+        self.connection = None  # session running the query, used to cancel it
+        self.rows = 0
+        self.preview = None  # first rows, shown while the rest streams in
+        self.result = None
+        self.error = None
+        self.future = None
+        self.cancel_requested = threading.Event()
+
+    @property
+    def active(self):
+        return self.status in ("queued", "running")
+
+    @property
+    def elapsed(self):
+        start = self.started or self.submitted
+        return (self.finished or time.time()) - start
+
+    def on_batch(self, batch):
+        """Progress callback for stream_result; raises once cancellation was requested"""
+        if self.cancel_requested.is_set():
+            raise QueryCancelled()
+        if self.preview is None:
+            self.preview = batch.head(PREVIEW_ROWS)
+        self.rows += len(batch)
+
+
+class QueryRunner:
+    """Worker pool running queries from every session in the background.
+
+    The pool size caps how many queries hit the warehouse at once and should
+    match the session pool, so a running job always has a session. Each
+    session may only have max_per_session queries queued or running. Jobs
+    are cancelled before they start by dropping them from the queue, and
+    while running by cancelling their Snowflake query ID on the job's own
+    session (cancel_remote(query_id, connection)) and by stopping the fetch
+    at the next batch.
+    """
+
+    def __init__(self, cancel_remote=None, max_workers=MAX_WORKERS, max_per_session=MAX_PER_SESSION):
+        self.cancel_remote = cancel_remote
+        self.max_per_session = max_per_session
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="snowflake-query")
+
+    def submit(self, session_jobs, sql, work):
+        """Queue work(job) for sql; session_jobs is the calling session's job list"""
+        if sum(job.active for job in session_jobs) >= self.max_per_session:
+            raise TooManyQueries(f"At most {self.max_per_session} queries can run at once; "
+                                 "wait for one to finish or cancel it")
+        job = QueryJob(sql)
+        job.future = self._executor.submit(self._run, job, work)
+        session_jobs.append(job)
+        return job
+
+    def _run(self, job, work):
+        if job.cancel_requested.is_set():
+            job.status, job.finished = "cancelled", time.time()
+            return
+        job.status, job.started = "running", time.time()
+        try:
+            job.result = work(job)
+            job.status = "cancelled" if job.cancel_requested.is_set() else "done"
+        except Exception as e:
+            if job.cancel_requested.is_set():
+                job.status = "cancelled"
+            else:
+                job.status, job.error = "failed", str(e)
+        finally:
+            job.finished = time.time()
+
+    def cancel(self, job):
+        job.cancel_requested.set()
+        if job.future.cancel():
+            job.status, job.finished = "cancelled", time.time()
+        elif job.query_id and self.cancel_remote is not None:
+            self.cancel_remote(job.query_id, job.connection)
@@ -0,0 +1,155 @@
+import os
+import threading
+import time
+
+# --- Session pool settings ---
+POOL_MAX_SIZE = int(os.environ.get("SNOWFLAKE_POOL_MAX", "4"))
+IDLE_TIMEOUT_S = float(os.environ.get("SNOWFLAKE_POOL_IDLE_TIMEOUT", "900"))
+KEEPALIVE_INTERVAL_S = float(os.environ.get("SNOWFLAKE_POOL_KEEPALIVE", "300"))
+ACQUIRE_TIMEOUT_S = 60
+# Connector error numbers meaning the session or its token is gone
+SESSION_EXPIRED_ERRNOS = {390111, 390112, 390114}
+
+
+def session_expired(error, conn):
+    """True if error means conn can't be used again and the query should be retried elsewhere"""
+    if getattr(error, "errno", None) in SESSION_EXPIRED_ERRNOS:
+        return True
+    try:
+        return conn.is_closed()
+    except Exception:
+        return True
+
+
+class SessionPool:
+    """Reusable connector sessions, so queries skip authentication and warehouse setup.
+
+    connect is any zero-argument callable returning a connection with the
+    Snowflake connector's interface (cursor(), is_closed(), close()), so a
+    local stand-in can replace the real connector. A background thread pings
+    sessions that sit idle past the keep-alive interval and closes those idle
+    past the idle timeout. A query whose session turns out to be expired is
+    retried once on a fresh session.
+    """
+
+    def __init__(self, connect, max_size=POOL_MAX_SIZE, idle_timeout=IDLE_TIMEOUT_S,
+                 keepalive_interval=KEEPALIVE_INTERVAL_S):
+        self.connect = connect
+        self.max_size = max(max_size, 1)
+        self.idle_timeout = idle_timeout
+        self.keepalive_interval = keepalive_interval
+        self._idle = []  # [connection, time returned, time last used or pinged]
+        self._size = 0
+        self._cond = threading.Condition()
+        self.stats = {"connects": 0, "reuses": 0, "reconnects": 0, "evictions": 0, "keepalives": 0,
+                      "connect_s_total": 0.0}
+        threading.Thread(target=self._maintain, name="snowflake-pool", daemon=True).start()
+
+    def _open(self):
+        start = time.perf_counter()
+        conn = self.connect()
+        elapsed = time.perf_counter() - start
+        with self._cond:
+            self.stats["connects"] += 1
+            self.stats["connect_s_total"] += elapsed
+        return conn, elapsed
+
+    def _close(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def acquire(self):
+        """Borrow a session; returns (connection, seconds spent connecting)"""
+        deadline = time.monotonic() + ACQUIRE_TIMEOUT_S
+        with self._cond:
+            while not self._idle and self._size >= self.max_size:
+                if not self._cond.wait(max(deadline - time.monotonic(), 0)) and time.monotonic() >= deadline:
+                    raise TimeoutError(f"All {self.max_size} Snowflake sessions are busy")
+            if self._idle:
+                conn = self._idle.pop()[0]
+                self.stats["reuses"] += 1
+                return conn, 0.0
+            self._size += 1
+        try:
+            return self._open()
+        except Exception:
+            self._discard_slot()
+            raise
+
+    def _discard_slot(self):
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    def release(self, conn, broken=False):
+        if broken:
+            self._close(conn)
+            self._discard_slot()
+            return
+        now = time.monotonic()
+        with self._cond:
+            self._idle.append([conn, now, now])
+            self._cond.notify()
+
+    def run(self, work):
+        """Call work(connection) on a pooled session, retrying once if the session expired.
+
+        Returns work's result and timings: seconds spent connecting, seconds in
+        work, and whether an existing session was reused.
+        """
+        for attempt in range(2):
+            conn, connect_s = self.acquire()
+            start = time.perf_counter()
+            try:
+                result = work(conn)
+            except Exception as e:
+                expired = session_expired(e, conn)
+                self.release(conn, broken=expired)
+                if expired and attempt == 0:
+                    with self._cond:
+                        self.stats["reconnects"] += 1
+                    continue
+                raise
+            self.release(conn)
+            return result, {"connect_s": connect_s, "execute_s": time.perf_counter() - start,
+                            "reused": connect_s == 0.0}
+
+    def _maintain(self):
+        while True:
+            time.sleep(min(self.keepalive_interval, self.idle_timeout, 60))
+            now = time.monotonic()
+            with self._cond:
+                expired = [entry for entry in self._idle if now - entry[1] >= self.idle_timeout]
+                stale = [entry for entry in self._idle
+                         if entry not in expired and now - entry[2] >= self.keepalive_interval]
+                for entry in expired + stale:
+                    self._idle.remove(entry)
+                self._size -= len(expired)
+                self.stats["evictions"] += len(expired)
+            for conn, _, _ in expired:
+                self._close(conn)
+            # Ping outside the lock, then hand healthy sessions back
+            for entry in stale:
+                conn = entry[0]
+                try:
+                    cursor = conn.cursor()
+                    try:
+                        cursor.execute("SELECT 1")
+                    finally:
+                        cursor.close()
+                except Exception:
+                    self._close(conn)
+                    self._discard_slot()
+                    continue
+                entry[2] = time.monotonic()
+                with self._cond:
+                    self.stats["keepalives"] += 1
+                    self._idle.append(entry)
+                    self._cond.notify()
+
+    def metrics(self):
+        with self._cond:
+            return dict(self.stats, size=self._size, idle=len(self._idle),
+                        in_use=self._size - len(self._idle), max_size=self.max_size)
@@ -0,0 +1,126 @@
+import os
+import time
+import uuid
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+try:
+    from snowflake.connector.errors import NotSupportedError
+except ImportError:  # the local stand-in has no Arrow batches either
+    class NotSupportedError(Exception):
+        pass
+
+# --- Result streaming settings ---
+MAX_ROWS = int(os.environ.get("SNOWFLAKE_MAX_ROWS", "500000"))  # rows kept in memory and shown
+MAX_BYTES = int(os.environ.get("SNOWFLAKE_MAX_MB", "256")) * 1024 * 1024
+FETCH_ROWS = 50_000  # batch size when the connector has no Arrow batches
+# Full results are spooled here and served by Streamlit's static file server
+RESULT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "query_results")
+RESULT_URL = "app/static/query_results"
+RESULT_TTL_S = 3600
+
+
+def arrow_batches(cursor):
+    """Result batches as Arrow tables, straight from the connector when it supports it"""
+    if hasattr(cursor, "fetch_arrow_batches"):
+        try:
+            batches = cursor.fetch_arrow_batches()
+        except NotSupportedError:
+            batches = None  # JSON-format results (SHOW, DESCRIBE, DML counts) have no Arrow form
+        if batches is not None:
+            yield from batches
+            return
+    columns = [desc[0] for desc in cursor.description]
+    while True:
+        rows = cursor.fetchmany(FETCH_ROWS)
+        if not rows:
+            return
+        yield pa.Table.from_pandas(pd.DataFrame(rows, columns=columns), preserve_index=False)
+
+
+def sweep_results(ttl=RESULT_TTL_S):
+    """Delete spooled results older than ttl seconds"""
+    if not os.path.isdir(RESULT_DIR):
+        return
+    cutoff = time.time() - ttl
+    for name in os.listdir(RESULT_DIR):
+        path = os.path.join(RESULT_DIR, name)
+        if os.path.getmtime(path) < cutoff:
+            os.remove(path)
+
+
+class ResultSpool:
+    """Writes every batch of a result to a Parquet or CSV file as it arrives"""
+
+    def __init__(self, fmt="parquet"):
+        os.makedirs(RESULT_DIR, exist_ok=True)
+        self.fmt = fmt
+        self.name = f"{uuid.uuid4().hex}.{fmt}"
+        self.path = os.path.join(RESULT_DIR, self.name)
+        self.schema = None
+        self._writer = None
+
+    def write(self, table):
+        """Append a batch; returns it as written, cast to the result's schema"""
+        if self._writer is None:
+            self.schema = table.schema
+            if self.fmt == "parquet":
+                self._writer = pq.ParquetWriter(self.path, self.schema)
+            else:
+                self._writer = pa_csv.CSVWriter(self.path, self.schema)
+        elif table.schema != self.schema:
+            # Batches built from Python rows can infer slightly different types
+            table = table.cast(self.schema)
+        self._writer.write_table(table)
+        return table
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+    @property
+    def url(self):
+        return f"{RESULT_URL}/{self.name}"
+
+
+def stream_result(cursor, on_batch=None, fmt="parquet", max_rows=MAX_ROWS, max_bytes=MAX_BYTES):
+    """Fetch a result batch by batch, keeping at most max_rows / max_bytes in memory.
+
+    on_batch(df) is called with each kept batch as it arrives, so callers can
+    display rows before the fetch finishes. Every batch, including those past
+    the caps, is written to a spool file for download. Returns the kept rows
+    as an Arrow table (None for an empty result) and fetch statistics.
+    """
+    spool = ResultSpool(fmt)
+    kept, kept_rows, kept_bytes = [], 0, 0
+    stats = {"rows": 0, "batches": 0, "truncated": False}
+    try:
+        for table in arrow_batches(cursor):
+            table = spool.write(table)
+            stats["rows"] += table.num_rows
+            stats["batches"] += 1
+            if stats["truncated"]:
+                continue
+            room = max_rows - kept_rows
+            if table.num_rows > room or kept_bytes + table.nbytes > max_bytes:
+                stats["truncated"] = True
+                # Keep the part of the batch that fits both caps
+                per_row = table.nbytes / max(table.num_rows, 1)
+                room = min(room, int((max_bytes - kept_bytes) / per_row) if per_row else room)
+                table = table.slice(0, max(room, 0))
+            if table.num_rows:
+                kept.append(table)
+                kept_rows += table.num_rows
+                kept_bytes += table.nbytes
+                if on_batch is not None:
+                    on_batch(table.to_pandas())
+    finally:
+        spool.close()
+
+    stats.update(kept_rows=kept_rows, kept_bytes=kept_bytes,
+                 spool_path=spool.path if spool.schema is not None else None,
+                 spool_url=spool.url if spool.schema is not None else None)
+    return (pa.concat_tables(kept) if kept else None), stats
@@ -0,0 +1,70 @@
+"""Local stand-in for snowflake.connector, for trying the query tool without an account.
+
+Connections are in-memory SQLite databases behind the parts of the connector
+API the tool uses, with configurable delays to mimic login and warehouse
+latency. Enable it with SNOWFLAKE_STANDIN=1; SNOWFLAKE_STANDIN_CONNECT_S and
+SNOWFLAKE_STANDIN_QUERY_S set the delays.
+"""
+import os
+import sqlite3
+import threading
+import time
+
+CONNECT_LATENCY_S = float(os.environ.get("SNOWFLAKE_STANDIN_CONNECT_S", "2.0"))
+QUERY_LATENCY_S = float(os.environ.get("SNOWFLAKE_STANDIN_QUERY_S", "0.2"))
+
+
+class StandinCursor:
+    def __init__(self, conn):
+        self._conn = conn
+        self._cursor = conn._db.cursor()
+        self.sfqid = None
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def execute(self, sql, params=None):
+        if self._conn.is_closed():
+            raise RuntimeError("Connection is closed")
+        time.sleep(self._conn.query_latency)
+        with self._conn._lock:
+            self._cursor.execute(sql, params or ())
+        return self
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def fetchmany(self, size):
+        return self._cursor.fetchmany(size)
+
+    def close(self):
+        self._cursor.close()
+
+
+class StandinConnection:
+    def __init__(self, connect_latency=CONNECT_LATENCY_S, query_latency=QUERY_LATENCY_S, **settings):
+        time.sleep(connect_latency)  # login and warehouse resume
+        self.settings = settings
+        self.query_latency = query_latency
+        self._db = sqlite3.connect(":memory:", check_same_thread=False)
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def cursor(self):
+        return StandinCursor(self)
+
+    def is_closed(self):
+        return self._closed
+
+    def close(self):
+        self._closed = True
+        self._db.close()
+
+
+def connect(**settings):
+    return StandinConnection(**settings)
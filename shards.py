@@ -0,0 +1,155 @@
+import multiprocessing
+import os
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from io import BytesIO
+
+import pandas as pd
+
+from csv_store import concat_frames, convert_datetime_columns, frame_nbytes, read_csv_compact
+from data_profile import is_numeric
+
+SHARD_WORKERS = min(os.cpu_count() or 1, 8)
+
+
+def expand_shards(files):
+    """(name, bytes) pairs for every CSV among files, unpacking zip archives"""
+    shards = []
+    for name, data in files:
+        if name.lower().endswith(".zip"):
+            with zipfile.ZipFile(BytesIO(data)) as archive:
+                for member in sorted(archive.namelist()):
+                    if member.lower().endswith(".csv") and not member.startswith("__MACOSX/"):
+                        shards.append((f"{name}/{member}", archive.read(member)))
+        else:
+            shards.append((name, data))
+    return shards
+
+
+def parse_shard(data, compact):
+    """Parse one shard, in a worker process"""
+    reader = read_csv_compact if compact else pd.read_csv
+    return convert_datetime_columns(reader(BytesIO(data)))
+
+
+def column_kind(series):
+    if is_numeric(series):
+        return "number"
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return "datetime"
+    return "text"
+
+
+def schema_of(df):
+    """Column names and broad kinds; int vs float or object vs category widths don't matter"""
+    return [(col, column_kind(df[col])) for col in df.columns]
+
+
+def schema_difference(expected, actual):
+    """Human-readable description of how actual differs from expected, or None if they match"""
+    if expected == actual:
+        return None
+    expected_cols, actual_cols = [c for c, _ in expected], [c for c, _ in actual]
+    if expected_cols != actual_cols:
+        missing = [c for c in expected_cols if c not in actual_cols]
+        extra = [c for c in actual_cols if c not in expected_cols]
+        if missing or extra:
+            return f"missing columns {missing}, unexpected columns {extra}"
+        return "columns are in a different order"
+    changed = [f"{col} ({kind} instead of {dict(expected)[col]})" for col, kind in actual
+               if dict(expected)[col] != kind]
+    return "different column types: " + ", ".join(changed)
+
+
+class ShardIngestion:
+    """Parse CSV shards in a process pool and collect them as they finish.
+
+    Results are checked against the schema of the first shard to finish;
+    mismatching shards are reported and left out. combine() can be called at
+    any time with the shards ready so far, so the dashboard can be explored
+    before the slowest shard is parsed.
+    """
+
+    def __init__(self, shards, compact=False, max_workers=SHARD_WORKERS):
+        self.names = [name for name, _ in shards]
+        self.compact = compact
+        self.schema = None
+        self.frames = {}  # shard name -> parsed frame
+        self.rows = {}  # shard name -> row count
+        self.errors = {}  # shard name -> error message
+        self.released = False
+        self._lock = threading.Lock()
+        # spawn rather than fork: the Streamlit server process runs many threads
+        executor = ProcessPoolExecutor(max_workers=max(1, min(max_workers, len(shards))),
+                                       mp_context=multiprocessing.get_context("spawn"))
+        futures = {executor.submit(parse_shard, data, compact): name for name, data in shards}
+        threading.Thread(target=self._collect, args=(executor, futures), daemon=True).start()
+
+    def _collect(self, executor, futures):
+        try:
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    df = future.result()
+                except Exception as e:
+                    with self._lock:
+                        self.errors[name] = f"could not parse: {e}"
+                    continue
+                with self._lock:
+                    if self.schema is None:
+                        self.schema = schema_of(df)
+                    difference = schema_difference(self.schema, schema_of(df))
+                    if difference:
+                        self.errors[name] = difference
+                    else:
+                        self.frames[name] = df
+                        self.rows[name] = len(df)
+        finally:
+            executor.shutdown(wait=False)
+
+    def progress(self):
+        """Number of shards finished (parsed or failed) and the total"""
+        with self._lock:
+            return len(self.rows) + len(self.errors), len(self.names)
+
+    @property
+    def done(self):
+        finished, total = self.progress()
+        return finished == total
+
+    def ready(self):
+        """Names of the parsed shards, in upload order"""
+        with self._lock:
+            return [name for name in self.names if name in self.rows]
+
+    def status(self, name):
+        with self._lock:
+            if name in self.rows:
+                return f"{self.rows[name]:,} rows"
+            return self.errors.get(name, "parsing...")
+
+    def combine(self, names, release=False):
+        """One frame from the given parsed shards, in the order given.
+
+        Partial results copy the shards, which are still needed for the next
+        combine. With release (once every shard is in), columns move out of
+        the shard frames as they are combined, so the full dataset is never
+        held twice; the ingestion can't be combined again after that.
+        """
+        with self._lock:
+            if self.released:
+                raise RuntimeError("Shards were already released; ingest the files again")
+            frames = [self.frames[name] for name in names]
+            if release:
+                self.released = True
+                self.frames = {}
+        df = concat_frames(frames, downcast=self.compact, release=release)
+        df.attrs["datetime_columns"] = frames[0].attrs.get("datetime_columns", [])
+        reports = [frame.attrs["memory_report"] for frame in frames if "memory_report" in frame.attrs]
+        if reports:
+            df.attrs["memory_report"] = {
+                "original_bytes": sum(r["original_bytes"] for r in reports),
+                "compact_bytes": frame_nbytes(df),
+            }
+        return df
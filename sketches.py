@@ -0,0 +1,346 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+from data_profile import MAX_VALUE_COUNTS, DatasetProfile, DESCRIBE_ROWS, is_numeric
+
+# --- Sketch settings ---
+SKETCH_CHUNK_ROWS = 500_000
+HLL_PRECISION = 14  # 2**14 registers, about 0.8% standard error
+QUANTILE_K = 200
+KLL_DECAY = 2 / 3  # capacity ratio between a compactor level and the one above it
+KLL_MIN_WIDTH = 8  # smallest capacity of any level
+CMS_WIDTH = 4096
+CMS_DEPTH = 4
+HEAVY_HITTERS = 200  # candidate values tracked per column
+RESERVOIR_ROWS = 100_000
+
+
+def _bit_length(values):
+    """Vectorized int.bit_length() for uint64 arrays"""
+    values = values.copy()
+    length = np.zeros(len(values), dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        wide = values >= np.uint64(1 << shift)
+        length[wide] += shift
+        values[wide] >>= np.uint64(shift)
+    return length + (values > 0)
+
+
+class HyperLogLog:
+    """Mergeable distinct-count sketch"""
+
+    def __init__(self, precision=HLL_PRECISION):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def update(self, series):
+        series = series.dropna()
+        if series.empty:
+            return
+        hashes = pd.util.hash_pandas_object(series, index=False).to_numpy()
+        suffix_bits = 64 - self.precision
+        buckets = (hashes >> np.uint64(suffix_bits)).astype(np.int64)
+        suffix = hashes & np.uint64((1 << suffix_bits) - 1)
+        ranks = (suffix_bits - _bit_length(suffix) + 1).astype(np.uint8)
+        best = pd.Series(ranks).groupby(buckets).max()
+        idx = best.index.to_numpy()
+        self.registers[idx] = np.maximum(self.registers[idx], best.to_numpy())
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.exp2(-self.registers.astype(np.float64)))
+        empty = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and empty:
+            return int(round(m * math.log(m / empty)))  # linear counting for small cardinalities
+        return int(round(raw))
+
+    def relative_error(self):
+        return 1.04 / math.sqrt(len(self.registers))
+
+
+class QuantileSketch:
+    """Mergeable KLL quantile sketch built from sort-and-halve compactors.
+
+    Level h holds items that each stand for 2**h input values. The top level
+    may hold k items and each level below it KLL_DECAY times as many as the
+    one above (at least KLL_MIN_WIDTH). A level that grows past its capacity
+    is sorted and every other item (random offset) is promoted, which keeps
+    memory at O(k) plus a few items per level.
+    """
+
+    def __init__(self, k=QUANTILE_K, seed=0):
+        self.k = k
+        self.levels = [np.empty(0)]
+        self.n = 0
+        self.rng = np.random.default_rng(seed)
+
+    def update(self, values):
+        values = values[~np.isnan(values)]
+        self.n += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def merge(self, other):
+        self.n += other.n
+        for h, items in enumerate(other.levels):
+            if h == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[h] = np.concatenate([self.levels[h], items])
+        self._compress()
+
+    def _capacity(self, h):
+        depth = len(self.levels) - 1 - h
+        return max(int(math.ceil(self.k * KLL_DECAY ** depth)), KLL_MIN_WIDTH)
+
+    def _compress(self):
+        # Compact the lowest level over capacity until none is; adding a level
+        # shrinks the capacities below it, so this can cascade
+        while True:
+            over = [h for h, items in enumerate(self.levels) if len(items) > self._capacity(h)]
+            if not over:
+                return
+            h = over[0]
+            items = np.sort(self.levels[h])
+            leftover = items[len(items) - len(items) % 2:]
+            promoted = items[self.rng.integers(2):len(items) - len(items) % 2:2]
+            self.levels[h] = leftover
+            if h + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[h + 1] = np.concatenate([self.levels[h + 1], promoted])
+
+    def quantiles(self, qs):
+        if self.n == 0:
+            return [np.nan] * len(qs)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level), 2.0 ** h) for h, level in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        cumulative = np.cumsum(weights[order])
+        positions = np.searchsorted(cumulative, np.asarray(qs) * cumulative[-1], side="left")
+        return items[order][np.minimum(positions, len(items) - 1)].tolist()
+
+    def rank_error(self):
+        # Empirical KLL normalized rank error fit at 99% confidence (Apache DataSketches)
+        return 2.296 / self.k ** 0.9723
+
+
+class FrequencySketch:
+    """Count-Min sketch plus a bounded set of heavy-hitter candidates"""
+
+    def __init__(self, width=CMS_WIDTH, depth=CMS_DEPTH, capacity=HEAVY_HITTERS):
+        self.width = width
+        self.depth = depth
+        self.capacity = capacity
+        self.table = np.zeros((depth, width), dtype=np.int64)
+        self.total = 0
+        # Kept in the column's dtype: an object index would hash bools and datetimes as strings
+        self.candidates = None
+
+    def _buckets(self, values):
+        index = pd.Index(values)
+        return np.stack([
+            (pd.util.hash_pandas_object(index, hash_key=f"cms-row-{row:08d}").to_numpy() % self.width).astype(np.int64)
+            for row in range(self.depth)
+        ])
+
+    def update(self, series):
+        counts = series.value_counts()
+        counts = counts[counts > 0]
+        if counts.empty:
+            return
+        self.total += int(counts.sum())
+        buckets = self._buckets(counts.index)
+        for row in range(self.depth):
+            np.add.at(self.table[row], buckets[row], counts.to_numpy())
+        self._refresh(counts.index[:self.capacity])
+
+    def merge(self, other):
+        self.table += other.table
+        self.total += other.total
+        if other.candidates is not None:
+            self._refresh(other.candidates)
+
+    def _refresh(self, new_candidates):
+        candidates = pd.Index(new_candidates)
+        if self.candidates is not None:
+            candidates = self.candidates.append(candidates).unique()
+        self.candidates = self.estimate(candidates).nlargest(self.capacity).index
+
+    def estimate(self, values):
+        """Estimated counts; never below the true count, at most error_bound() above it"""
+        if len(values) == 0:
+            return pd.Series([], dtype=np.int64)
+        buckets = self._buckets(values)
+        counts = np.min([self.table[row][buckets[row]] for row in range(self.depth)], axis=0)
+        return pd.Series(counts, index=pd.Index(values))
+
+    def top(self):
+        if self.candidates is None:
+            return pd.Series([], dtype=np.int64)
+        return self.estimate(self.candidates).sort_values(ascending=False)
+
+    def error_bound(self):
+        return math.e / self.width * self.total
+
+    def confidence(self):
+        return 1 - math.exp(-self.depth)
+
+
+class ReservoirSample:
+    """Mergeable uniform row sample: keeps the rows with the smallest random priorities"""
+
+    def __init__(self, size=RESERVOIR_ROWS, seed=0):
+        self.size = size
+        self.rng = np.random.default_rng(seed)
+        self.priorities = np.empty(0)
+        self.rows = None
+
+    def update(self, chunk):
+        priorities = self.rng.random(len(chunk))
+        if len(chunk) > self.size:
+            keep = np.argpartition(priorities, self.size)[:self.size]
+            chunk, priorities = chunk.iloc[keep], priorities[keep]
+        self._combine(chunk, priorities)
+
+    def merge(self, other):
+        if other.rows is not None:
+            self._combine(other.rows, other.priorities)
+
+    def _combine(self, rows, priorities):
+        rows = rows if self.rows is None else pd.concat([self.rows, rows])
+        priorities = np.concatenate([self.priorities, priorities])
+        if len(priorities) > self.size:
+            keep = np.argpartition(priorities, self.size)[:self.size]
+            rows, priorities = rows.iloc[keep], priorities[keep]
+        self.rows, self.priorities = rows, priorities
+
+    def sample(self):
+        return self.rows.sort_index() if self.rows is not None else None
+
+
+class DatasetSketch:
+    """Streaming, mergeable summary of a dataset for the approximate-statistics mode.
+
+    Counts, missing values, mean, std, min and max are exact (streaming
+    moments); cardinality, quantiles and top values come from sketches whose
+    error bounds are reported by error_bounds().
+    """
+
+    def __init__(self, df):
+        self.columns = df.columns.tolist()
+        self.dtypes = df.dtypes.astype(str)
+        self.numeric = [col for col in self.columns if is_numeric(df[col])]
+        self.rows = 0
+        self.missing = pd.Series(0, index=self.columns, dtype=np.int64)
+        self.distinct = {col: HyperLogLog() for col in self.columns}
+        self.quantiles = {col: QuantileSketch() for col in self.numeric}
+        self.frequencies = {col: FrequencySketch() for col in self.columns if col not in self.numeric}
+        self.moments = pd.DataFrame(0.0, index=self.numeric, columns=["count", "mean", "m2"])
+        self.minimum = pd.Series(np.nan, index=self.numeric)
+        self.maximum = pd.Series(np.nan, index=self.numeric)
+        self.reservoir = ReservoirSample()
+
+    def update(self, chunk):
+        self.rows += len(chunk)
+        self.missing += chunk.isna().sum()
+        for col in self.columns:
+            self.distinct[col].update(chunk[col])
+        for col, sketch in self.frequencies.items():
+            sketch.update(chunk[col])
+        if self.numeric:
+            num = chunk[self.numeric]
+            for col in self.numeric:
+                self.quantiles[col].update(num[col].to_numpy(dtype=np.float64, na_value=np.nan))
+            chunk_moments = pd.DataFrame({"count": num.count(), "mean": num.mean(),
+                                          "m2": num.var(ddof=0) * num.count()}).fillna(0.0)
+            self._merge_moments(chunk_moments, num.min(), num.max())
+        self.reservoir.update(chunk)
+
+    def merge(self, other):
+        self.rows += other.rows
+        self.missing += other.missing
+        for col in self.columns:
+            self.distinct[col].merge(other.distinct[col])
+        for col, sketch in self.frequencies.items():
+            sketch.merge(other.frequencies[col])
+        for col in self.numeric:
+            self.quantiles[col].merge(other.quantiles[col])
+        self._merge_moments(other.moments, other.minimum, other.maximum)
+        self.reservoir.merge(other.reservoir)
+
+    def _merge_moments(self, other, other_min, other_max):
+        # Chan et al. parallel update of count, mean and sum of squared deviations
+        a, b = self.moments, other
+        count = a["count"] + b["count"]
+        safe = count.where(count > 0, 1.0)
+        delta = b["mean"] - a["mean"]
+        mean = a["mean"] + delta * b["count"] / safe
+        m2 = a["m2"] + b["m2"] + delta ** 2 * a["count"] * b["count"] / safe
+        self.moments = pd.DataFrame({"count": count, "mean": mean, "m2": m2})
+        self.minimum = pd.concat([self.minimum, other_min], axis=1).min(axis=1)
+        self.maximum = pd.concat([self.maximum, other_max], axis=1).max(axis=1)
+
+    def error_bounds(self):
+        hll = next(iter(self.distinct.values()), HyperLogLog())
+        bounds = {"unique": f"±{2 * hll.relative_error():.1%} (95% confidence)"}
+        if self.quantiles:
+            k = next(iter(self.quantiles.values()))
+            bounds["quantiles"] = f"±{k.rank_error():.1%} of rank (99% confidence)"
+        if self.frequencies:
+            cms = next(iter(self.frequencies.values()))
+            worst = max(sketch.error_bound() for sketch in self.frequencies.values())
+            bounds["counts"] = f"overcount ≤ {worst:,.0f} rows ({cms.confidence():.0%} confidence)"
+        return bounds
+
+    def to_profile(self):
+        """A DatasetProfile backed by the sketches, so every tab can read it unchanged"""
+        summary = pd.DataFrame(index=self.columns)
+        summary["dtype"] = self.dtypes
+        summary["numeric"] = [col in self.numeric for col in self.columns]
+        summary["missing"] = self.missing
+        summary["missing_pct"] = (self.missing / max(self.rows, 1) * 100).round(2)
+        summary["count"] = self.rows - self.missing
+        for name in DESCRIBE_ROWS[1:]:
+            summary[name] = None
+        summary["unique"] = [min(self.distinct[col].estimate(), int(summary.at[col, "count"]))
+                             for col in self.columns]
+
+        if self.numeric:
+            count = self.moments["count"]
+            summary.loc[self.numeric, "mean"] = self.moments["mean"].where(count > 0)
+            summary.loc[self.numeric, "std"] = np.sqrt(self.moments["m2"] / (count - 1)).where(count > 1)
+            summary.loc[self.numeric, "min"] = self.minimum
+            summary.loc[self.numeric, "max"] = self.maximum
+            for col in self.numeric:
+                q25, q50, q75 = self.quantiles[col].quantiles([0.25, 0.5, 0.75])
+                summary.loc[col, ["25%", "50%", "75%"]] = [q25, q50, q75]
+
+        value_counts = {}
+        for col, sketch in self.frequencies.items():
+            counts = sketch.top().head(MAX_VALUE_COUNTS)
+            counts.index.name = col
+            counts.name = "count"
+            value_counts[col] = counts
+            if not counts.empty:
+                summary.at[col, "top"] = counts.index[0]
+                summary.at[col, "freq"] = counts.iloc[0]
+
+        return DatasetProfile(self.rows, summary, value_counts, {}, error_bounds=self.error_bounds())
+
+    def sample(self, df):
+        """Reservoir sample of rows, or df itself when it was empty"""
+        sample = self.reservoir.sample()
+        return df.iloc[0:0] if sample is None else sample
+
+
+def build_sketches(df, chunk_rows=SKETCH_CHUNK_ROWS):
+    """Build a DatasetSketch in one streaming pass over row chunks"""
+    sketch = DatasetSketch(df)
+    for start in range(0, len(df), chunk_rows):
+        sketch.update(df.iloc[start:start + chunk_rows])
+    return sketch
@@ -1,6 +1,20 @@
+import os
+import time
+
 import streamlit as st
 import pandas as pd
-import snowflake.connector
+
+from sf_pool import SessionPool
+from sf_results import MAX_ROWS, stream_result, sweep_results
+from sf_cache import ResultCache, cache_key, cacheable, dml_target
+from sf_jobs import QueryRunner, TooManyQueries
+
+# SNOWFLAKE_STANDIN=1 runs against a local SQLite stand-in that simulates connection latency
+USE_STANDIN = os.environ.get("SNOWFLAKE_STANDIN") == "1"
+if USE_STANDIN:
+    import sf_standin as connector
+else:
+    import snowflake.connector as connector
 
 # Snowflake connection parameters
 SNOWFLAKE_USER = "soumyabrata"  # Replace with your username
@@ -9,43 +23,107 @@ SNOWFLAKE_ACCOUNT = "***"  # Replace with your account identifier
 SNOWFLAKE_WAREHOUSE = "COMPUTE_WH"  # Replace with your warehouse
 SNOWFLAKE_DATABASE = "tasty_bytes_sample_data"  # Replace with your database
 SNOWFLAKE_SCHEMA = "raw_pos"  # Replace with your schema
+ASYNC_POLL_S = 0.5  # how often a submitted query's status is checked
+
+
+def connect():
+    """Open a Snowflake session"""
+    return connector.connect(
+        user=SNOWFLAKE_USER,
+        password=SNOWFLAKE_PASSWORD,
+        account=SNOWFLAKE_ACCOUNT,
+        warehouse=SNOWFLAKE_WAREHOUSE,
+        database=SNOWFLAKE_DATABASE,
+        schema=SNOWFLAKE_SCHEMA,
+        client_session_keep_alive=True
+    )
+
+
+@st.cache_resource
+def get_session_pool():
+    """Sessions shared by all users, so queries don't pay for login and warehouse setup"""
+    return SessionPool(connect)
+
+
+@st.cache_resource
+def get_result_cache():
+    """Query results shared by all users, keyed on normalized SQL and session context"""
+    return ResultCache()
 
 
-def execute_query(query):
-    """Execute SQL query on Snowflake and return results as DataFrame"""
+def cancel_query(query_id, conn):
+    """Ask Snowflake to stop a running query, on the session running it.
+
+    Borrowing from the pool would block while every session is busy, which
+    is usually when a query gets cancelled; the connector lets a second
+    cursor share the connection.
+    """
+    cursor = conn.cursor()
     try:
-        # Create a connection to Snowflake
-        conn = snowflake.connector.connect(
-            user=SNOWFLAKE_USER,
-            password=SNOWFLAKE_PASSWORD,
-            account=SNOWFLAKE_ACCOUNT,
-            warehouse=SNOWFLAKE_WAREHOUSE,
-            database=SNOWFLAKE_DATABASE,
-            schema=SNOWFLAKE_SCHEMA
-        )
-
-        # Execute query and fetch results
-        cursor = conn.cursor()
-        cursor.execute(query)
-
-        # Get column names
-        columns = [desc[0] for desc in cursor.description] if cursor.description else []
-
-        # Fetch all results
-        data = cursor.fetchall()
-
-        # Close connection
+        cursor.execute("SELECT SYSTEM$CANCEL_QUERY(%s)", (query_id,))
+    finally:
         cursor.close()
-        conn.close()
 
-        # Return results as DataFrame
-        if columns:
-            return pd.DataFrame(data, columns=columns), None
+
+@st.cache_resource
+def get_query_runner():
+    """Background workers for every session's queries; the pool size caps warehouse load"""
+    return QueryRunner(cancel_remote=cancel_query, max_workers=get_session_pool().max_size)
+
+
+def run_query(conn, query, on_batch=None, fmt="parquet", on_submit=None):
+    # Submit asynchronously when the connector can, so the query ID is known (and cancellable) at once
+    cursor = conn.cursor()
+    try:
+        if hasattr(cursor, "execute_async"):
+            cursor.execute_async(query)
+            if on_submit is not None:
+                on_submit(cursor.sfqid, conn)
+            # Hold the session until the query finishes (raising if it failed or was cancelled),
+            # then load its result; get_results_from_sfqid would defer that to the first fetch
+            while conn.is_still_running(conn.get_query_status_throw_if_error(cursor.sfqid)):
+                time.sleep(ASYNC_POLL_S)
+            cursor.query_result(cursor.sfqid)
         else:
-            return None, f"Query executed successfully. Rows affected: {cursor.rowcount}"
+            cursor.execute(query)
+        if cursor.description:
+            table, stats = stream_result(cursor, on_batch=on_batch, fmt=fmt)
+            if table is None:
+                table = pd.DataFrame(columns=[desc[0] for desc in cursor.description])
+            else:
+                table = table.to_pandas()
+            return table, None, stats
+        return None, f"Query executed successfully. Rows affected: {cursor.rowcount}", None
+    finally:
+        cursor.close()
+
 
+def execute_query(query, on_batch=None, fmt="parquet", use_cache=True, on_submit=None):
+    """Execute SQL query on Snowflake, streaming batches to on_batch; returns DataFrame, message, stats, timings"""
+    cache = get_result_cache()
+    key = cache_key(query, SNOWFLAKE_DATABASE, SNOWFLAKE_SCHEMA, SNOWFLAKE_WAREHOUSE)
+    # Decided from the statement text: Snowflake returns a result set for writes too
+    if use_cache and cacheable(query):
+        cached = cache.get(key)
+        if cached is not None:
+            df, stats, age = cached
+            # The spooled download may have expired before the cache entry
+            if stats and stats["spool_path"] and not os.path.exists(stats["spool_path"]):
+                stats = dict(stats, spool_path=None, spool_url=None)
+            return df, None, stats, {"cached": True, "age_s": age}
+
+    try:
+        (df, message, stats), timings = get_session_pool().run(
+            lambda conn: run_query(conn, query, on_batch, fmt, on_submit))
     except Exception as e:
-        return None, f"Error executing query: {str(e)}"
+        return None, f"Error executing query: {str(e)}", None, None
+
+    table = dml_target(query)
+    if table:
+        cache.invalidate(table=table)
+    elif df is not None and cacheable(query):
+        cache.put(key, query, df, stats)
+    return df, message, stats, timings
 
 
 # Set page title
@@ -58,19 +136,122 @@ st.title("Snowflake Query Tool ❄️")
 st.markdown("### Enter SQL Query")
 query = st.text_area("", height=150, placeholder="SELECT * FROM your_table LIMIT 10")
 
-# Execute button
+use_cache = st.checkbox("Use cached results", value=True,
+                        help="Identical queries (ignoring case, spacing and comments) in the same "
+                             "database, schema and warehouse are answered from the cache")
+download_format = st.radio("Download format", ["parquet", "csv"], horizontal=True,
+                           help="The full result is written to this file while it streams in, "
+                                f"even past the {MAX_ROWS:,} rows shown here")
+
+if "query_jobs" not in st.session_state:
+    st.session_state.query_jobs = []
+jobs = st.session_state.query_jobs
+
+
+def run_job(job, fmt, use_cache):
+    """Worker body: run the job's query, reporting its ID and streamed rows on the job"""
+    def on_submit(query_id, conn):
+        job.query_id, job.connection = query_id, conn
+    return execute_query(job.sql, on_batch=job.on_batch, fmt=fmt, use_cache=use_cache, on_submit=on_submit)
+
+
+# Execute button: queries run in the background, so several can be in flight at once
 if st.button("Execute Query", type="primary"):
     if query:
-        # Show spinner while executing query
-        with st.spinner("Executing query..."):
-            df_result, message = execute_query(query)
+        sweep_results()
+        # Create the shared pool and cache here, on the script thread; workers only look them up
+        get_session_pool(), get_result_cache()
+        try:
+            get_query_runner().submit(jobs, query, lambda job: run_job(job, download_format, use_cache))
+        except TooManyQueries as e:
+            st.warning(str(e))
+    else:
+        st.warning("Please enter a SQL query")
+
+
+@st.fragment(run_every=1)
+def running_queries():
+    """Live status of this session's queued and running queries.
 
-        # Display results or message
-        st.markdown("### Query Results")
+    Reruns only itself while queries run, and the whole page once one
+    finishes, so finished results are drawn once rather than every second.
+    """
+    active = [job for job in jobs if job.active]
+    shown = st.session_state.get("shown_active", set())
+    st.session_state.shown_active = {job.id for job in active}
+    if shown - st.session_state.shown_active:
+        st.rerun()
+    if not active:
+        return
+
+    st.markdown("### Running Queries")
+    for job in reversed(active):
+        with st.container(border=True):
+            status_col, cancel_col = st.columns([5, 1])
+            status = f"**{job.status.capitalize()}** for {job.elapsed:.0f}s"
+            if job.rows:
+                status += f", {job.rows:,} rows fetched"
+            if job.query_id:
+                status += f" · query ID `{job.query_id}`"
+            status_col.markdown(status)
+            status_col.code(job.sql, language="sql")
+            if cancel_col.button("Cancel", key=f"cancel_{job.id}", disabled=job.cancel_requested.is_set()):
+                try:
+                    get_query_runner().cancel(job)
+                except Exception as e:
+                    # The fetch still stops at the next batch
+                    st.toast(f"Could not cancel query {job.query_id} on Snowflake: {e}")
+                st.rerun(scope="fragment")
+            # The panel redraws every second, so only a bounded preview is sent while the
+            # query fetches; the full result is drawn once, when the job finishes
+            if job.preview is not None:
+                st.caption(f"First {len(job.preview):,} rows")
+                st.dataframe(job.preview, use_container_width=True)
+
+
+running_queries()
+
+# Display results or message of finished queries, newest first
+finished = [job for job in jobs if not job.active]
+if finished:
+    st.markdown("### Query Results")
+for job in reversed(finished):
+    with st.container(border=True):
+        header_col, remove_col = st.columns([5, 1])
+        header_col.code(job.sql, language="sql")
+        if remove_col.button("Remove", key=f"remove_{job.id}"):
+            jobs.remove(job)
+            st.rerun()
+        if job.status == "cancelled":
+            st.info(f"Cancelled after {job.elapsed:.1f}s")
+            continue
+        if job.status == "failed":
+            st.error(f"Error executing query: {job.error}")
+            continue
+
+        df_result, message, stats, timings = job.result
         if df_result is not None:
             st.dataframe(df_result, use_container_width=True)
-            st.success(f"Query returned {len(df_result)} rows")
+            st.success(f"Query returned {stats['rows']:,} rows")
+            if stats["truncated"]:
+                st.warning(f"Showing the first {stats['kept_rows']:,} rows; download the file for all of them.")
+            if stats["spool_url"]:
+                fmt = os.path.splitext(stats["spool_url"])[1].lstrip(".")
+                st.markdown(f'<a href="{stats["spool_url"]}" download="query_result.{fmt}">'
+                            f'📥 Download full result ({fmt})</a>', unsafe_allow_html=True)
         elif message:
             st.info(message)
-    else:
-        st.warning("Please enter a SQL query")
\ No newline at end of file
+        if timings and timings.get("cached"):
+            st.caption(f"Served from cache, fetched {timings['age_s']:.0f}s ago; "
+                       "untick 'Use cached results' to run it again")
+        elif timings:
+            session = "reused session" if timings["reused"] else f"connected in {timings['connect_s']:.2f}s"
+            st.caption(f"{session}, executed in {timings['execute_s']:.2f}s")
+
+with st.sidebar.expander("Session pool"):
+    st.write(get_session_pool().metrics())
+
+with st.sidebar.expander("Result cache"):
+    st.write(get_result_cache().metrics())
+    if st.button("Clear result cache"):
+        st.toast(f"Dropped {get_result_cache().invalidate()} cached result(s)")
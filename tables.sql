@@ -4,9 +4,15 @@ CREATE TABLE hr.employee (
 	salary numeric(12, 2) NULL,
 	designation varchar(100) NULL,
 	department varchar(100) NULL,
+	changed_by varchar(100) NULL,
+	reason varchar(100) NULL,
+	changed_time timestamp NULL,
 	CONSTRAINT employee_pkey PRIMARY KEY (emp_id)
 );
 
+-- Incremental refreshes fetch rows changed since a watermark
+CREATE INDEX employee_changed_time_idx ON hr.employee (changed_time);
+
 INSERT INTO hr.employee
 (emp_id, "name", salary, designation, department, changed_by, reason, changed_time)
 VALUES(2, 'Bob Smith', 1010.00, 'Senior Engineer', 'IT', 'Soumya', 'Promotion', '2025-05-06 12:12:07.957');
@@ -15,4 +21,29 @@ INSERT INTO hr.employee
 VALUES(3, 'Carol White', 10301.00, 'HR Specialist X', 'HR', 'aaff', 'Annual Review', '2025-05-06 12:12:21.715');
 INSERT INTO hr.employee
 (emp_id, "name", salary, designation, department, changed_by, reason, changed_time)
-VALUES(1, 'Alice Johnson', 1005.00, 'Software Engineer', 'IT', 'Soumya', 'Correction', '2025-05-07 11:30:50.227');
\ No newline at end of file
+VALUES(1, 'Alice Johnson', 1005.00, 'Software Engineer', 'IT', 'Soumya', 'Correction', '2025-05-07 11:30:50.227');
+
+-- Editors LISTEN on this channel and patch their cached rows instead of polling
+CREATE OR REPLACE FUNCTION hr.notify_employee_change() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        PERFORM pg_notify('employee_changes', json_build_object('op', TG_OP)::text);
+        RETURN NULL;
+    END IF;
+    IF TG_OP = 'DELETE' OR (TG_OP = 'UPDATE' AND OLD.emp_id <> NEW.emp_id) THEN
+        PERFORM pg_notify('employee_changes', json_build_object('op', 'DELETE', 'emp_id', OLD.emp_id)::text);
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        PERFORM pg_notify('employee_changes', json_build_object('op', TG_OP, 'emp_id', NEW.emp_id)::text);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER employee_notify
+AFTER INSERT OR UPDATE OR DELETE ON hr.employee
+FOR EACH ROW EXECUTE FUNCTION hr.notify_employee_change();
+
+CREATE TRIGGER employee_notify_truncate
+AFTER TRUNCATE ON hr.employee
+FOR EACH STATEMENT EXECUTE FUNCTION hr.notify_employee_change();